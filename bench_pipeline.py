@@ -0,0 +1,451 @@
+"""
+Offline end-to-end benchmark: run_reports.main() against a local fake Odoo
+server and an in-memory fake Google Sheets backend, with injectable latency
+and simulated 429s. Nothing leaves the machine.
+
+The fake Odoo speaks the same JSON-RPC / form endpoints the pipeline uses
+(authenticate, /web csrf_token, session info, call_kw onchange / web_save /
+write / search_read, call_button, /report/download) and serves the committed
+ot_analysis_*.xlsx workbooks cut down to the requested days, or for --source raw attendance records that add
+up to the first of them.
+
+    python bench_pipeline.py [--runs 2] [--workers 3] [--latency-ms 20] [--render-ms 300]
+                             [--sheets-latency-ms 50] [--rate-limit-every 4] [--sync diff] [-v]
+"""
+import os
+import io
+import re
+import sys
+import glob
+import json
+import time
+import argparse
+import tempfile
+import threading
+import contextlib
+from datetime import datetime
+from collections import Counter
+from urllib.parse import parse_qs, urlsplit
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+from gspread.exceptions import APIError
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SAMPLES = sorted(glob.glob(os.path.join(HERE, "ot_analysis_*.xlsx")))
+SAMPLE_RANGE = re.compile(r"ot_analysis_(\d{4}-\d{2}-\d{2})_to_(\d{4}-\d{2}-\d{2})_cat\d+\.xlsx$")
+
+REPORT_NAME = "attendance_pdf_report.ot_analysis_xlsx"
+CSRF_TOKEN = "offline-csrf-token"
+XLSX_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+# ===== Fake Odoo =====
+class FakeOdoo:
+    """Local Odoo stand-in. `latency` is added to every request, `render` to call_button and downloads."""
+
+    def __init__(self, latency=0.0, render=0.0):
+        self.latency = latency
+        self.render = render
+        self.calls = Counter()
+        self.wizards = {}
+        self.attendance_write_date = "2025-09-01 18:00:00"
+        self.raw = None   # (category label, records), built on the first raw request
+        self.workbooks = {}   # ("category", id, date_from, date_to) → XLSX bytes
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler())
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def sample_for(self, options):
+        """The committed workbook for the requested range, else the longest one covering it, else the first."""
+        wanted = (options.get("date_from"), options.get("date_to"))
+        ranges = {path: SAMPLE_RANGE.search(path).groups() for path in SAMPLES}
+        for path, (start, end) in ranges.items():
+            if (start, end) == wanted:
+                return path
+        covering = [path for path, (start, end) in ranges.items() if start <= wanted[0] and wanted[1] <= end]
+        return min(covering, key=lambda path: ranges[path]) if covering else SAMPLES[0]
+
+    def sample_rows(self, options):
+        """
+        The sample's second tab cut down to the requested days, Total column
+        re-summed, so incremental fetches get only the columns they asked for.
+        """
+        import openpyxl
+        from ot_history import parse_day_label, to_date   # not before the env is set
+        path = self.sample_for(options)
+        sample_from, sample_to = map(to_date, SAMPLE_RANGE.search(path).groups())
+        date_from, date_to = to_date(options["date_from"]), to_date(options["date_to"])
+        wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = [list(row) for row in wb.worksheets[1].iter_rows(values_only=True)]
+        finally:
+            wb.close()
+        headings = rows[3]   # title row, category label, blank row, then the headings
+        keep = [c for c in range(3, len(headings)) if headings[c] is not None
+                and date_from <= parse_day_label(headings[c], sample_from, sample_to) <= date_to]
+        trimmed = []
+        for i, row in enumerate(rows):
+            days = [row[c] if c < len(row) else None for c in keep]
+            total = row[2] if len(row) > 2 else None
+            if i > 3 and isinstance(total, (int, float)):
+                total = sum(v for v in days if isinstance(v, (int, float)))
+            trimmed.append(row[:2] + [total] + days)
+        return trimmed
+
+    @staticmethod
+    def workbook(rows):
+        """XLSX bytes with `rows` on the second tab, where read_second_tab() looks."""
+        import openpyxl
+        buffer = io.BytesIO()
+        wb = openpyxl.Workbook()
+        ws = wb.create_sheet("OT Analysis")
+        for row in rows:
+            ws.append(row)
+        wb.save(buffer)
+        return buffer.getvalue()
+
+    def category_workbook(self, options):
+        key = ("category", options["category_id"], options["date_from"], options["date_to"])
+        with self.lock:
+            if key not in self.workbooks:
+                rows = self.sample_rows(options)
+                rows[1][0] = self.category_label(options["category_id"])
+                self.workbooks[key] = self.workbook(rows)
+            return self.workbooks[key]
+
+    def rpc(self, path, params, cookie):
+        method = params.get("method")
+        if path == "/web/session/authenticate":
+            return {"uid": 2}
+        if path == "/web/session/get_session_info":
+            return {"uid": 2 if "session_id=" in cookie else None}
+        if path == "/web/dataset/call_button":
+            time.sleep(self.render)
+            return {"type": "ir.actions.report", "report_name": REPORT_NAME, "report_type": "xlsx"}
+        if method == "onchange":
+            return {"value": {"report_type": "ot_analysis", "mode_type": "category"}}
+        if method == "web_save":
+            with self.lock:
+                wizard_id = len(self.wizards) + 1
+                self.wizards[wizard_id] = dict(params["args"][1])
+            return [{"id": wizard_id}]
+        if method == "search_read" and params["kwargs"].get("fields") == ["write_date"]:
+            return [{"id": 1, "write_date": self.attendance_write_date}]   # the report cache's freshness probe
+        if method in ("search_count", "search_read", "read"):
+            category, records = self.raw_records()
+            if method == "read":
+                return [{"id": cid, "display_name": self.category_label(cid)} for cid in params["args"][0]]
+            if method == "search_count":
+                return len(records)
+            offset, limit = params["kwargs"]["offset"], params["kwargs"]["limit"]
+            return records[offset:offset + limit]
+        if method == "write":
+            ids, values = params["args"]
+            with self.lock:
+                for wizard_id in ids:
+                    self.wizards[wizard_id].update(values)
+            return True
+        raise ValueError(f"unsupported call {path} {method}")
+
+    def category_label(self, category_id):
+        return f"Category {category_id}"
+
+    def raw_records(self):
+        with self.lock:
+            if self.raw is None:
+                from bench_raw_pivot import sample_records   # imports ot_report, so not before the env is set
+                start, end = SAMPLE_RANGE.search(SAMPLES[0]).groups()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    self.raw = sample_records(SAMPLES[0], start, end)
+            return self.raw
+
+    def handler(self):
+        odoo = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"   # keep-alive, like a real Odoo behind nginx
+
+            def log_message(self, *args):
+                pass
+
+            def reply(self, status, body, content_type, headers=()):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                time.sleep(odoo.latency)
+                odoo.calls[f"GET {self.path}"] += 1
+                html = f'<script>odoo.__session_info__ = {{csrf_token : "{CSRF_TOKEN}"}};</script>'
+                self.reply(200, html.encode(), "text/html")
+
+            def do_POST(self):
+                time.sleep(odoo.latency)
+                path = urlsplit(self.path).path
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if path == "/report/download":
+                    return self.download(body)
+
+                request = json.loads(body)
+                params = request.get("params", {})
+                odoo.calls[f"{path} {params.get('method', '')}".strip()] += 1
+                try:
+                    reply = {"jsonrpc": "2.0", "id": request.get("id"),
+                             "result": odoo.rpc(path, params, self.headers.get("Cookie", ""))}
+                except Exception as e:
+                    reply = {"jsonrpc": "2.0", "id": request.get("id"), "error": {
+                        "code": 200, "message": "Odoo Server Error",
+                        "data": {"name": type(e).__name__, "message": str(e), "debug": ""}}}
+                headers = [("Set-Cookie", "session_id=offline; Path=/")] if path.endswith("authenticate") else []
+                self.reply(200, json.dumps(reply).encode(), "application/json", headers)
+
+            def download(self, body):
+                odoo.calls["/report/download"] += 1
+                form = {key: values[0] for key, values in parse_qs(body.decode()).items()}
+                if form.get("csrf_token") != CSRF_TOKEN:
+                    return self.reply(400, b"<html>Session expired (invalid CSRF token)</html>", "text/html")
+                report_path = json.loads(form["data"])[0]
+                if not report_path.startswith(f"/report/xlsx/{REPORT_NAME}?"):
+                    return self.reply(404, b"<html>Report not found</html>", "text/html")
+                options = json.loads(report_path.split("?options=", 1)[1].split("&context=", 1)[0])
+                time.sleep(odoo.render)
+                self.reply(200, odoo.category_workbook(options), XLSX_TYPE)
+
+        return Handler
+
+
+# ===== Fake Google Sheets =====
+def quota_error(retry_after=0.2):
+    """A real gspread APIError for HTTP 429, as the Sheets API returns it."""
+    response = requests.Response()
+    response.status_code = 429
+    response.headers["Retry-After"] = str(retry_after)
+    response._content = json.dumps({"error": {
+        "code": 429, "status": "RESOURCE_EXHAUSTED",
+        "message": "Quota exceeded for quota metric 'Write requests' per minute per user."}}).encode()
+    return APIError(response)
+
+
+def col_index(letters):
+    """A1 column letters → 0-based index."""
+    idx = 0
+    for ch in letters:
+        idx = idx * 26 + ord(ch) - 64
+    return idx - 1
+
+
+def user_entered(value):
+    """What USER_ENTERED makes of a value, as a FORMULA-rendered read returns it."""
+    if not isinstance(value, str) or value.startswith("="):
+        return value
+    try:
+        return (datetime.strptime(value, "%d-%b-%y") - datetime(1899, 12, 30)).days
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+class FakeSheets:
+    """
+    In-memory Sheets backend shared by every spreadsheet: counts API calls,
+    adds `latency` per call and answers every `rate_limit_every`-th call with 429.
+    """
+
+    def __init__(self, latency=0.0, rate_limit_every=0, tabs=("Sheet1", "Sheet2", "Sheet3")):
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.tabs = tabs
+        self.calls = Counter()
+        self.rate_limited = 0
+        self.spreadsheets = {}
+        self.lock = threading.Lock()
+
+    def api_call(self, name):
+        time.sleep(self.latency)
+        with self.lock:
+            self.calls[name] += 1
+            total = sum(self.calls.values())
+            if self.rate_limit_every and total % self.rate_limit_every == 0:
+                self.rate_limited += 1
+                raise quota_error()
+
+    def open_by_url(self, url):
+        self.api_call("open_by_url")
+        key = re.search(r"/d/([^/]+)", url).group(1)
+        with self.lock:
+            if key not in self.spreadsheets:
+                self.spreadsheets[key] = FakeSpreadsheet(self, key)
+            return self.spreadsheets[key]
+
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, sheet_id, title):
+        self.spreadsheet = spreadsheet
+        self.id = sheet_id
+        self.title = title
+        self.row_count = 1000
+        self.col_count = 26
+        self.cells = {}   # (row, col) → value as FORMULA-rendered by Sheets
+
+    def grid(self):
+        if not self.cells:
+            return []
+        rows = max(r for r, _ in self.cells) + 1
+        cols = max(c for _, c in self.cells) + 1
+        grid = [[self.cells.get((r, c), "") for c in range(cols)] for r in range(rows)]
+        for row in grid:   # Sheets trims trailing empty cells
+            while row and row[-1] == "":
+                row.pop()
+        return grid
+
+    def batch_get(self, ranges, value_render_option=None):
+        self.spreadsheet.backend.api_call("values_batch_get")
+        return [self.grid()]
+
+
+class FakeSpreadsheet:
+    def __init__(self, backend, key):
+        self.backend = backend
+        self.id = key
+        self.title = f"Offline {key[:8]}"
+        self.tabs = {title: FakeWorksheet(self, i, title) for i, title in enumerate(backend.tabs)}
+        self.by_id = {ws.id: ws for ws in self.tabs.values()}
+
+    def worksheets(self):
+        self.backend.api_call("worksheets")
+        return list(self.tabs.values())
+
+    def values_batch_get(self, ranges, params=None):
+        self.backend.api_call("values_batch_get")
+        titles = [r.split("!")[0].strip("'") for r in ranges]
+        return {"valueRanges": [{"values": self.tabs[title].grid()} for title in titles]}
+
+    def batch_update(self, body):
+        self.backend.api_call("batch_update")
+        for request in body["requests"]:
+            if "updateSheetProperties" in request:
+                props = request["updateSheetProperties"]["properties"]
+                ws = self.by_id[props["sheetId"]]
+                ws.row_count = props["gridProperties"]["rowCount"]
+                ws.col_count = props["gridProperties"]["columnCount"]
+            elif "updateCells" in request:
+                self.update_cells(request["updateCells"])
+        return {"replies": [{} for _ in body["requests"]]}
+
+    def update_cells(self, update):
+        self.by_id[update["range"]["sheetId"]].cells.clear()   # only ever a whole-tab clear
+
+    def values_batch_update(self, body):
+        self.backend.api_call("values_batch_update")
+        for value_range in body["data"]:
+            title, cells = value_range["range"].split("!")
+            ws = self.tabs[title.strip("'")]
+            col, row = re.match(r"([A-Z]+)(\d+)", cells).groups()
+            for r, values in enumerate(value_range["values"], int(row) - 1):
+                for c, value in enumerate(values, col_index(col)):
+                    if value == "":
+                        ws.cells.pop((r, c), None)
+                    else:
+                        ws.cells[(r, c)] = user_entered(value)
+        return {}
+
+
+# ===== Benchmark =====
+def offline_environment(odoo_url, workdir):
+    """Point every cache, history and trace path at `workdir` before ot_report is imported."""
+    os.environ.update({
+        "ODOO_URL": odoo_url, "ODOO_DB": "offline", "ODOO_USERNAME": "bench", "ODOO_PASSWORD": "bench",
+        "ODOO_SESSION_CACHE": os.path.join(workdir, ".odoo_session.json"),
+        "ODOO_REPORT_NAME_CACHE": os.path.join(workdir, ".odoo_report_names.json"),
+        "OT_HISTORY_DIR": os.path.join(workdir, "ot_history"),
+        "OT_TRACE_DIR": os.path.join(workdir, "traces"),
+        "OT_CACHE_DIR": os.path.join(workdir, "ot_cache"),
+        "SHEETS_HASHES": os.path.join(workdir, ".sheets_hashes.json"),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("jobs", nargs="*", help="job names to run (default: all)")
+    parser.add_argument("--runs", type=int, default=2, help="back-to-back runs (caches stay warm)")
+    parser.add_argument("-w", "--workers", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=20, help="added to every Odoo request")
+    parser.add_argument("--render-ms", type=float, default=300, help="added to call_button and downloads")
+    parser.add_argument("--sheets-latency-ms", type=float, default=50, help="added to every Sheets call")
+    parser.add_argument("--sheets-per-minute", type=int, default=60,
+                        help="client-side Sheets quota (the runner's token buckets)")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="answer every Nth Sheets call with 429")
+    parser.add_argument("--sync", choices=["full", "diff"], default="diff")
+    parser.add_argument("--totals", choices=["formula", "values"], default="formula")
+    parser.add_argument("--reuse-wizard", action="store_true")
+    parser.add_argument("--direct-download", action="store_true")
+    parser.add_argument("--incremental", action="store_true")
+    parser.add_argument("--source", choices=["xlsx", "raw"], default="xlsx")
+    parser.add_argument("--cache-ttl", type=float, default=0, metavar="HOURS")
+    parser.add_argument("--cache-probe", action="store_true")
+    parser.add_argument("--skip-unchanged", action="store_true")
+    parser.add_argument("-v", "--verbose", action="store_true", help="show the pipeline's own output")
+    args = parser.parse_args()
+    if not SAMPLES:
+        raise SystemExit("❌ No ot_analysis_*.xlsx samples next to bench_pipeline.py")
+
+    odoo = FakeOdoo(args.latency_ms / 1000, args.render_ms / 1000).start()
+    sheets = FakeSheets(args.sheets_latency_ms / 1000, args.rate_limit_every)
+    workdir = tempfile.mkdtemp(prefix="ot_bench_")
+    offline_environment(odoo.url, workdir)
+    os.environ["SHEETS_READS_PER_MINUTE"] = os.environ["SHEETS_WRITES_PER_MINUTE"] = str(args.sheets_per_minute)
+    os.chdir(workdir)   # downloaded workbooks land here
+
+    import ot_report
+    import run_reports
+    start, end = (SAMPLE_RANGE.search(SAMPLES[0]).groups())
+    ot_report.DATE_FROM, ot_report.DATE_TO = start, end
+    run_reports.authorize_gspread = lambda: sheets
+
+    print(f"🧪 Offline bench in {workdir}: Odoo {args.latency_ms:.0f}ms + {args.render_ms:.0f}ms render, "
+          f"Sheets {args.sheets_latency_ms:.0f}ms, 429 every {args.rate_limit_every or '∞'} call(s)")
+    print(f"{'run':<5}{'wall':>8}{'odoo req':>10}{'sheets':>8}{'429s':>6}  status")
+    try:
+        for run in range(1, args.runs + 1):
+            odoo_before, sheets_before, limited_before = sum(odoo.calls.values()), sum(sheets.calls.values()), sheets.rate_limited
+            out = io.StringIO()
+            started = time.perf_counter()
+            status = "ok"
+            with contextlib.redirect_stdout(sys.stdout if args.verbose else out):
+                try:
+                    run_reports.main(args.jobs or None, args.workers, args.incremental, args.sync, args.totals,
+                                     reuse_wizard=args.reuse_wizard, direct=args.direct_download,
+                                     cache_ttl=args.cache_ttl, cache_probe=args.cache_probe,
+                                     skip_unchanged=args.skip_unchanged, source=args.source)
+                except SystemExit as e:
+                    status = str(e)
+            wall = time.perf_counter() - started
+            print(f"{run:<5}{wall:>7.2f}s{sum(odoo.calls.values()) - odoo_before:>10}"
+                  f"{sum(sheets.calls.values()) - sheets_before:>8}{sheets.rate_limited - limited_before:>6}  {status}")
+    finally:
+        odoo.stop()
+
+    print("\nOdoo endpoints:", dict(sorted(odoo.calls.items())))
+    print("Sheets calls:  ", dict(sorted(sheets.calls.items())))
+    print(f"Traces:         {os.path.join(workdir, 'traces')}")
+
+
+if __name__ == "__main__":
+    main()
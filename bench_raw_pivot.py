@@ -0,0 +1,111 @@
+"""
+Benchmark the raw-records path (ot_raw.records_frame + pivot_report) against
+parsing the rendered workbook (read_second_tab) on the committed
+ot_analysis_*.xlsx samples, and check both give the same frame.
+
+The attendance records are synthesised from each workbook: every section/day
+cell is split over up to `pieces` check-ins, hours in half-hour steps. They use
+ot_raw.RAW_FIELDS, so this checks the pivot mechanics and their speed only; it
+says nothing about whether those fields exist or hold the report's figures.
+
+    python bench_raw_pivot.py [--repeats 5] [--pieces 4]
+"""
+import re
+import glob
+import time
+import random
+import argparse
+import contextlib
+import io
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from pandas.testing import assert_frame_equal
+
+import ot_raw
+import ot_history
+from ot_report import ODOO_TZ, read_second_tab
+
+SAMPLE_RANGE = re.compile(r"ot_analysis_(\d{4}-\d{2}-\d{2})_to_(\d{4}-\d{2}-\d{2})_cat\d+\.xlsx$")
+
+
+def sample_records(xlsx_path, date_from, date_to, pieces=4, seed=0):
+    """(category label, search_read-style records) that add up to the workbook's figures."""
+    rng = random.Random(seed)
+    layout, table = ot_history.split_report(read_second_tab(xlsx_path), date_from, date_to)
+    tz = ZoneInfo(ODOO_TZ)
+    fields = ot_raw.RAW_FIELDS
+    records = []
+
+    def add(section_id, section, day, hours, cost):
+        local = datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=tz) + timedelta(hours=rng.randint(6, 21))
+        records.append({
+            "id": len(records) + 1,
+            fields["check_in"]: local.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+            fields["section"]: [section_id, section],
+            fields["hours"]: hours,
+            fields["cost"]: cost,
+        })
+
+    sections = [s for s in dict.fromkeys(table.index.get_level_values("section")) if s != "Total"]
+    for day in table.columns[~table.any()]:
+        add(1, sections[0], day, 0.0, 0.0)   # attendance without OT still gets its column
+    for section_id, section in enumerate(sections, 1):
+        hours_row, cost_row = table.loc[(section, "OT Hours")], table.loc[(section, "OT Cost")]
+        if not hours_row.any() and not cost_row.any():
+            add(section_id, section, table.columns[0], 0.0, 0.0)   # section listed with no OT
+        for day in table.columns:
+            hours, cost = hours_row[day], cost_row[day]
+            if not hours and not cost:
+                continue
+            halves = int(round(hours * 2))
+            n = max(1, min(rng.randint(1, pieces), halves)) if halves == hours * 2 else 1
+            cuts = sorted(rng.sample(range(1, halves), n - 1)) if n > 1 else []
+            parts = [(b - a) / 2 for a, b in zip([0] + cuts, cuts + [halves])] if n > 1 else [hours]
+            for part in parts:
+                add(section_id, section, day, part, cost * part / hours if hours else cost)
+    rng.shuffle(records)   # Odoo pages arrive by id, not grouped by section
+    return layout["category"], records
+
+
+def best_of(func, repeats, *args):
+    best, result = float("inf"), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def raw_path(records, category, date_from, date_to):
+    return ot_raw.pivot_report(ot_raw.records_frame(records), category, date_from, date_to)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--pieces", type=int, default=4, help="max check-ins per section/day cell")
+    args = parser.parse_args()
+    files = sorted(glob.glob("ot_analysis_*.xlsx"))
+    if not files:
+        raise SystemExit("❌ No ot_analysis_*.xlsx samples in the current directory")
+
+    print(f"{'workbook':<50}{'records':>9}{'xlsx':>11}{'raw':>11}{'speedup':>9}")
+    total_xlsx = total_raw = 0.0
+    for path in files:
+        date_from, date_to = SAMPLE_RANGE.search(path).groups()
+        with contextlib.redirect_stdout(io.StringIO()):
+            category, records = sample_records(path, date_from, date_to, args.pieces)
+        t_xlsx, expected = best_of(read_second_tab, args.repeats, path)
+        t_raw, built = best_of(raw_path, args.repeats, records, category, date_from, date_to)
+        assert_frame_equal(built, expected, check_exact=False, rtol=1e-9)
+        total_xlsx += t_xlsx
+        total_raw += t_raw
+        print(f"{path:<50}{len(records):>9}{t_xlsx * 1000:>9.1f}ms{t_raw * 1000:>9.1f}ms{t_xlsx / t_raw:>8.1f}x")
+    print(f"{'total':<59}{total_xlsx * 1000:>9.1f}ms{total_raw * 1000:>9.1f}ms{total_xlsx / total_raw:>8.1f}x")
+    print("xlsx = parsing the downloaded workbook only; Odoo's render and download come on top of it.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Benchmark read_second_tab() against the old pd.read_excel(sheet_name=1) path
+on the committed ot_analysis_*.xlsx sample workbooks.
+
+    python bench_read_second_tab.py [repeats]
+"""
+import sys
+import glob
+import time
+import contextlib
+import io
+
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from ot_report import read_second_tab
+
+
+def old_read(xlsx_path, row_limit):
+    return pd.read_excel(xlsx_path, sheet_name=1).head(row_limit)
+
+
+def new_read(xlsx_path, row_limit):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return read_second_tab(xlsx_path, row_limit)
+
+
+def best_of(func, repeats, *args):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(repeats=5):
+    files = sorted(glob.glob("ot_analysis_*.xlsx"))
+    if not files:
+        raise SystemExit("❌ No ot_analysis_*.xlsx samples in the current directory")
+
+    print(f"{'workbook':<50}{'rows':>6}{'read_excel':>12}{'streamed':>12}{'speedup':>9}")
+    total_old = total_new = 0.0
+    for path in files:
+        for row_limit in (47, 80):
+            assert_frame_equal(new_read(path, row_limit), old_read(path, row_limit))
+            t_old = best_of(old_read, repeats, path, row_limit)
+            t_new = best_of(new_read, repeats, path, row_limit)
+            total_old += t_old
+            total_new += t_new
+            print(f"{path:<50}{row_limit:>6}{t_old * 1000:>10.1f}ms{t_new * 1000:>10.1f}ms{t_old / t_new:>8.1f}x")
+    print(f"{'total':<56}{total_old * 1000:>10.1f}ms{total_new * 1000:>10.1f}ms{total_old / total_new:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,83 @@
+"""
+Micro-benchmark: the old replace().where().values.tolist() cleanup chain vs
+the NumPy-backed sheet_values() on a synthetic wide OT frame.
+
+    python bench_sheet_values.py [employees] [days] [repeats]
+"""
+import sys
+import time
+import warnings
+import tracemalloc
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from ot_report import sheet_values
+
+
+def synthetic_report(employees, days, seed=0):
+    """A read_second_tab()-shaped frame with NaN gaps and a few inf cells."""
+    rng = np.random.default_rng(seed)
+    start = date(2025, 8, 1)
+    labels = [f"{start + timedelta(days=i):%d %b %a}" for i in range(days)]
+    hours = rng.choice([0, 0, 0, 0.5, 1, 2.5, 3.5, 4], size=(employees, days)).astype(object)
+    hours[rng.random((employees, days)) < 0.02] = np.nan
+    hours[rng.random((employees, days)) < 0.001] = np.inf
+
+    rows = [["B-Worker"] + [np.nan] * (days + 2), [np.nan] * (days + 3),
+            ["Section", np.nan, "Total"] + labels]
+    for i in range(employees):
+        rows.append([f"Section {i // 2}" if i % 2 == 0 else np.nan,
+                     "OT Hours" if i % 2 == 0 else "OT Cost", 0] + list(hours[i]))
+    columns = ["Daily OT Cost Report"] + [f"Unnamed: {i}" for i in range(1, days + 3)]
+    return pd.DataFrame(rows, columns=columns)
+
+
+def old_values(df, row_limit):
+    """The pre-NumPy conversion from the original scripts' paste_to_google_sheet(), without the formula rows."""
+    df = df.head(row_limit)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=UserWarning)
+        df_row4 = pd.to_datetime(df.iloc[3], errors='coerce')
+    df_row4 = df_row4.dt.strftime('%d-%b-%y')
+    df_row4 = df_row4.fillna("")
+    df.iloc[3] = df_row4
+    df = df.replace([float('inf'), float('-inf')], "").where(pd.notnull(df), "")
+    return [list(df.columns)] + df.values.tolist()
+
+
+def new_values(df, row_limit):
+    return sheet_values(df, row_limit, [row_limit + 4, row_limit + 5])[:row_limit + 1]
+
+
+def measure(func, df, row_limit, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(df, row_limit)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    func(df, row_limit)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main(employees=4000, days=400, repeats=5):
+    df = synthetic_report(employees, days)
+    row_limit = len(df)
+    if old_values(df, row_limit) != new_values(df, row_limit):
+        raise SystemExit("❌ Old and new conversions disagree")
+
+    print(f"Frame: {df.shape[0]} rows x {df.shape[1]} columns")
+    t_old, m_old = measure(old_values, df, row_limit, repeats)
+    t_new, m_new = measure(new_values, df, row_limit, repeats)
+    print(f"{'':<14}{'time':>10}{'peak alloc':>14}")
+    print(f"{'replace/where':<14}{t_old * 1000:>8.0f}ms{m_old / 1048576:>12.1f}MiB")
+    print(f"{'sheet_values':<14}{t_new * 1000:>8.0f}ms{m_new / 1048576:>12.1f}MiB")
+    print(f"Speedup {t_old / t_new:.1f}x, peak allocations {m_old / m_new:.1f}x lower")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:4]))
@@ -0,0 +1,150 @@
+import os
+import json
+import time
+import shutil
+import threading
+
+import pandas as pd
+
+import ot_history
+from ot_report import read_second_tab, options_key
+
+# ===== Report result cache =====
+CACHE_DIR = os.getenv("OT_CACHE_DIR", "ot_cache")
+CACHE_TTL_HOURS = float(os.getenv("OT_CACHE_TTL_HOURS", "0"))   # 0 = cache disabled
+CACHE_MAX_MB = float(os.getenv("OT_CACHE_MAX_MB", "200"))       # least recently used entries go first
+CACHE_PROBE = os.getenv("OT_CACHE_PROBE", "0") == "1"           # also compare Odoo's latest attendance write
+
+
+def cache_key(company_id, options):
+    """
+    options_key() without date_from: incremental runs move their window's
+    start after every run, so entries are found by everything else and
+    report which date_from they cover.
+    """
+    return options_key(company_id, {**options, "date_from": None})
+
+
+class ReportCache:
+    """
+    Downloaded workbooks and their parsed frames, keyed by cache_key(). An
+    entry is served while it is younger than `ttl_hours` and, when a `probe`
+    is given, while probe(company_id, date_to) still returns the value recorded
+    with it. The probe runs once per company and date per run. An entry that
+    starts earlier than asked for is served trimmed to the requested days.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, ttl_hours=CACHE_TTL_HOURS, max_mb=CACHE_MAX_MB, probe=None):
+        self.cache_dir = cache_dir
+        self.ttl = ttl_hours * 3600
+        self.max_bytes = max_mb * 1024 * 1024
+        self.probe = probe
+        self.tokens = {}
+        self.probe_lock = threading.Lock()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.index_path = os.path.join(cache_dir, "index.json")
+        try:
+            with open(self.index_path) as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+
+    def paths(self, key):
+        return os.path.join(self.cache_dir, f"{key}.xlsx"), os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def save_index(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(f"{self.index_path}.tmp", "w") as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(f"{self.index_path}.tmp", self.index_path)
+
+    def freshness(self, company_id, date_to):
+        """The probe's answer for this company/date, asked once per run; None if unknown."""
+        if self.probe is None:
+            return None
+        with self.probe_lock:   # parallel jobs of one company wait for a single probe
+            if (company_id, date_to) not in self.tokens:
+                try:
+                    self.tokens[(company_id, date_to)] = self.probe(company_id, date_to)
+                except Exception as e:
+                    print(f"⚠️ Freshness probe failed for company {company_id} ({e}); relying on the TTL")
+                    self.tokens[(company_id, date_to)] = None
+            return self.tokens[(company_id, date_to)]
+
+    def get(self, key, company_id, date_from, date_to, row_limit=None):
+        """The cached frame for `key` (first `row_limit` rows, days from `date_from`), or None on a miss."""
+        with self.lock:
+            entry = self.index.get(key)
+            xlsx_path, frame_path = self.paths(key)
+            reason = None
+            if entry is None:
+                reason = "not cached"
+            elif time.time() - entry["created"] > self.ttl:
+                reason = f"older than {self.ttl / 3600:g}h"
+            elif entry.get("date_from") is None or entry["date_from"] > date_from:
+                reason = f"cached from {entry.get('date_from')}, asked from {date_from}"
+            elif not os.path.exists(xlsx_path):
+                reason = "workbook missing"
+        if not reason:   # only an entry that could be used is worth a probe
+            token = self.freshness(company_id, date_to)
+            if token is not None and entry.get("freshness") != token:
+                reason = "attendance changed since it was cached"
+        if reason:
+            with self.lock:
+                self.misses += 1
+            print(f"🗄️ Cache miss {key}: {reason}")
+            return None
+        with self.lock:
+            entry["last_used"] = time.time()
+            self.hits += 1
+            cached_rows = entry.get("row_limit")
+
+        if cached_rows is None or (row_limit is not None and cached_rows >= row_limit):
+            df = pd.read_pickle(frame_path)
+            df = df.head(row_limit) if row_limit is not None else df
+        else:
+            df = read_second_tab(xlsx_path, row_limit)   # parsed with fewer rows last time
+        if entry["date_from"] != date_from:
+            layout, table = ot_history.split_report(df, entry["date_from"], date_to)
+            df = ot_history.build_report(layout, table, date_from, date_to)
+        print(f"🗄️ Cache hit {key} ({os.path.basename(entry['source'])}, "
+              f"{(time.time() - entry['created']) / 3600:.1f}h old, from {date_from})")
+        with self.lock:
+            self.save_index()
+        return df
+
+    def put(self, key, company_id, date_from, date_to, xlsx_path, df, row_limit=None):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        cached_xlsx, frame_path = self.paths(key)
+        shutil.copyfile(xlsx_path, f"{cached_xlsx}.tmp")
+        os.replace(f"{cached_xlsx}.tmp", cached_xlsx)
+        df.to_pickle(f"{frame_path}.tmp")
+        os.replace(f"{frame_path}.tmp", frame_path)
+        token = self.freshness(company_id, date_to)
+        now = time.time()
+        with self.lock:
+            self.index[key] = {
+                "created": now, "last_used": now, "source": xlsx_path, "row_limit": row_limit,
+                "date_from": date_from,
+                "freshness": token, "bytes": os.path.getsize(cached_xlsx) + os.path.getsize(frame_path),
+            }
+            self.evict()
+            self.save_index()
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes; caller holds the lock."""
+        total = sum(entry["bytes"] for entry in self.index.values())
+        for key in sorted(self.index, key=lambda k: self.index[k]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            total -= self.index.pop(key)["bytes"]
+            for path in self.paths(key):
+                if os.path.exists(path):
+                    os.remove(path)
+            print(f"🗄️ Evicted {key} from the report cache")
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.index),
+                "bytes": sum(entry["bytes"] for entry in self.index.values())}
@@ -0,0 +1,139 @@
+import os
+import json
+from datetime import datetime, date, timedelta
+
+import numpy as np
+import pandas as pd
+
+# ===== Incremental OT history =====
+HISTORY_DIR = os.getenv("OT_HISTORY_DIR", "ot_history")
+RESYNC_DAYS = int(os.getenv("OT_RESYNC_DAYS", "3"))   # re-fetch recent days for late attendance fixes
+
+FIRST_DATA_ROW = 3   # read_second_tab() rows 0-2: category label, blank row, column headings
+FIRST_DAY_COL = 3    # columns A-C: section, metric, total
+
+
+def to_date(value):
+    return value if isinstance(value, date) else datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def parse_day_label(label, date_from, date_to):
+    """'01 Aug Fri' → date, picking the year that puts it inside [date_from, date_to]."""
+    day_month = datetime.strptime(" ".join(str(label).split()[:2]), "%d %b")
+    for year in range(date_from.year, date_to.year + 1):
+        day = day_month.replace(year=year).date()
+        if date_from <= day <= date_to:
+            return day
+    raise RuntimeError(f"Day column {label!r} is outside {date_from} → {date_to}")
+
+
+def split_report(df, date_from, date_to):
+    """
+    Split a read_second_tab() frame into its layout (title, labels) and a float
+    table indexed by (section, metric) with one column per report day.
+    """
+    date_from, date_to = to_date(date_from), to_date(date_to)
+    headings = df.iloc[FIRST_DATA_ROW - 1]
+    days = [parse_day_label(label, date_from, date_to) for label in headings.iloc[FIRST_DAY_COL:]]
+
+    body = df.iloc[FIRST_DATA_ROW:]
+    sections = body.iloc[:, 0].ffill()
+    index = pd.MultiIndex.from_arrays([sections.tolist(), body.iloc[:, 1].tolist()],
+                                      names=["section", "metric"])
+    table = pd.DataFrame(body.iloc[:, FIRST_DAY_COL:].to_numpy(dtype=float),
+                         index=index, columns=[d.isoformat() for d in days])
+
+    layout = {
+        "title": df.columns[0],
+        "category": df.iloc[0, 0],
+        "headings": [headings.iloc[0], headings.iloc[1], headings.iloc[2]],
+    }
+    return layout, table
+
+
+def build_report(layout, table, date_from, date_to):
+    """Rebuild the read_second_tab() frame for [date_from, date_to] from stored history."""
+    date_from, date_to = to_date(date_from).isoformat(), to_date(date_to).isoformat()
+    days = sorted(c for c in table.columns if date_from <= c <= date_to)
+    table = table[days]
+
+    def cell(value):
+        return int(value) if float(value).is_integer() else value
+
+    num_cols = FIRST_DAY_COL + len(days)
+    rows = [
+        [layout["category"]] + [np.nan] * (num_cols - 1),
+        [np.nan] * num_cols,
+        layout["headings"] + [f"{datetime.strptime(d, '%Y-%m-%d'):%d %b %a}" for d in days],
+    ]
+    previous = None
+    for (section, metric), values in zip(table.index, table.to_numpy()):
+        label = section if section != previous else np.nan
+        previous = section
+        rows.append([label, metric, cell(values.sum())] + [cell(v) for v in values])
+
+    columns = [layout["title"]] + [f"Unnamed: {i}" for i in range(1, num_cols)]
+    return pd.DataFrame(rows, columns=columns)
+
+
+def history_paths(key):
+    return os.path.join(HISTORY_DIR, f"{key}.pkl"), os.path.join(HISTORY_DIR, f"{key}.json")
+
+
+def load_history(key):
+    table_path, meta_path = history_paths(key)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        return meta, pd.read_pickle(table_path)
+    except (OSError, ValueError):
+        return None, None
+
+
+def save_history(key, meta, table):
+    os.makedirs(HISTORY_DIR, exist_ok=True)
+    table_path, meta_path = history_paths(key)
+    table.to_pickle(f"{table_path}.tmp")
+    os.replace(f"{table_path}.tmp", table_path)
+    with open(f"{meta_path}.tmp", "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(f"{meta_path}.tmp", meta_path)
+
+
+def merge_tables(history, fresh):
+    """Fresh day columns win; rows keep the fresh report's order, history-only rows go last."""
+    fresh_rows = set(fresh.index)
+    index = list(fresh.index) + [i for i in history.index if i not in fresh_rows]
+    merged = history.reindex(index)
+    for day in fresh.columns:
+        merged[day] = fresh[day].reindex(index)
+    return merged.fillna(0.0)[sorted(merged.columns)]
+
+
+def update_report(key, date_from, date_to, fetch, resync_days=RESYNC_DAYS):
+    """
+    Return the report for [date_from, date_to], calling fetch(from, to) only for
+    days after the last synced one (minus `resync_days`) and merging the result
+    into the history kept under `key`.
+    """
+    date_from, date_to = to_date(date_from), to_date(date_to)
+    meta, history = load_history(key)
+
+    fetch_from = date_from
+    if history is not None:
+        synced_to = to_date(meta["synced_to"])
+        fetch_from = max(date_from, synced_to + timedelta(days=1 - resync_days))
+
+    if fetch_from > date_to:
+        print(f"📦 {key}: history already covers {date_to}, no fetch needed")
+        return build_report(meta["layout"], history, date_from, date_to)
+
+    print(f"📦 {key}: fetching {fetch_from} → {date_to} "
+          f"({'full range' if history is None else f'{resync_days} re-sync day(s)'})")
+    layout, fresh = split_report(fetch(fetch_from.isoformat(), date_to.isoformat()), fetch_from, date_to)
+    table = fresh if history is None else merge_tables(history, fresh)
+
+    synced_to = max(fresh.columns, default=meta["synced_to"] if meta else None)
+    if synced_to:
+        save_history(key, {"synced_to": synced_to, "layout": layout}, table)
+    return build_report(layout, table, date_from, date_to)
@@ -0,0 +1,137 @@
+import os
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import ot_history
+from ot_report import ODOO_TZ, ODOO_POOL_SIZE, rpc, retry, count_rpc, odoo_context, category_names
+from ot_trace import traced
+
+# ===== Raw attendance source =====
+# Instead of rendering the XLSX, read the attendance lines the report is built
+# from and pivot them here. Field names belong to the OT module on the Odoo
+# side and the defaults below are UNCONFIRMED guesses (hr.attendance with
+# overtime_hours/ot_cost): check a raw run against an xlsx run of the same
+# days, and override them if the database uses different ones.
+RAW_MODEL = os.getenv("OT_RAW_MODEL", "hr.attendance")
+RAW_FIELDS = {
+    "check_in": os.getenv("OT_RAW_DATE_FIELD", "check_in"),           # UTC datetime, bucketed by local day
+    "section": os.getenv("OT_RAW_SECTION_FIELD", "department_id"),    # many2one shown as the report section
+    "hours": os.getenv("OT_RAW_HOURS_FIELD", "overtime_hours"),
+    "cost": os.getenv("OT_RAW_COST_FIELD", "ot_cost"),
+}
+RAW_COMPANY_FIELD = os.getenv("OT_RAW_COMPANY_FIELD", "employee_id.company_id")
+RAW_CATEGORY_FIELD = os.getenv("OT_RAW_CATEGORY_FIELD", "employee_id.category_id")
+RAW_PAGE_SIZE = int(os.getenv("OT_RAW_PAGE_SIZE", "2000"))
+
+REPORT_TITLE = "Daily OT Cost Report"
+HEADINGS = ["Section", np.nan, "Total"]
+METRICS = ["OT Hours", "OT Cost"]
+TOTAL_ROWS = [("Total", "Total OT Hours"), ("Total", "Total OT Cost")]   # filled by sheet formulas, 0 in the XLSX
+NO_SECTION = "Undefined"
+
+
+def utc_bounds(date_from, date_to):
+    """[start of date_from, end of date_to] in ODOO_TZ, as Odoo UTC datetime strings."""
+    tz = ZoneInfo(ODOO_TZ)
+    start = datetime.strptime(date_from, "%Y-%m-%d").replace(tzinfo=tz)
+    end = datetime.strptime(date_to, "%Y-%m-%d").replace(tzinfo=tz) + timedelta(days=1)
+    fmt = "%Y-%m-%d %H:%M:%S"
+    return start.astimezone(timezone.utc).strftime(fmt), end.astimezone(timezone.utc).strftime(fmt)
+
+
+def raw_domain(company_id, category_id, date_from, date_to):
+    start, end = utc_bounds(date_from, date_to)
+    date_field = RAW_FIELDS["check_in"]
+    return [
+        [RAW_COMPANY_FIELD, "=", company_id],
+        [RAW_CATEGORY_FIELD, "in", [category_id]],   # many2one or many2many
+        [date_field, ">=", start],
+        [date_field, "<", end],
+    ]
+
+
+@traced("raw_fetch")
+def fetch_records(uid, company_id, category_id, date_from, date_to, page_size=RAW_PAGE_SIZE):
+    """
+    Attendance lines of one category and company in [date_from, date_to], plus
+    the category's display name. The record count comes first; the pages
+    (ordered by id, only RAW_FIELDS) are then requested concurrently.
+    """
+    domain = raw_domain(company_id, category_id, date_from, date_to)
+    context = odoo_context(uid, company_id)
+    names = category_names(uid, company_id, [category_id])
+    if category_id not in names:
+        raise RuntimeError(f"Category {category_id} not found")
+    count_rpc("search_count")
+    total = rpc.call_kw(RAW_MODEL, "search_count", [domain], {"context": context})
+
+    def page(offset):
+        count_rpc("search_read")
+        return rpc.call_kw(RAW_MODEL, "search_read", [domain], {
+            "fields": list(RAW_FIELDS.values()), "offset": offset, "limit": page_size,
+            "order": "id", "context": context,
+        })
+
+    offsets = range(0, total, page_size)
+    with ThreadPoolExecutor(max_workers=max(1, min(ODOO_POOL_SIZE, len(offsets)))) as pool:
+        pages = list(pool.map(page, offsets))
+    records = [record for chunk in pages for record in chunk]
+    if len(records) != total:
+        raise RuntimeError(f"{RAW_MODEL}: expected {total} records, got {len(records)} (changed while paging?)")
+    print(f"✅ Fetched {total} {RAW_MODEL} record(s) in {len(pages)} page(s)")
+    return names[category_id], records
+
+
+def records_frame(records):
+    """search_read records → DataFrame(day, section, hours, cost), day as local midnight."""
+    df = pd.DataFrame.from_records(records, columns=["id", *RAW_FIELDS.values()])
+    sections = df[RAW_FIELDS["section"]]
+    check_in = pd.to_datetime(df[RAW_FIELDS["check_in"]], format="%Y-%m-%d %H:%M:%S", utc=True)
+    return pd.DataFrame({
+        # formatted per unique day in pivot_report, not per record
+        "day": check_in.dt.tz_convert(ODOO_TZ).dt.tz_localize(None).dt.normalize(),
+        # many2one → [id, name]; False when unset
+        "section": [value[1] if value else NO_SECTION for value in sections],
+        "hours": pd.to_numeric(df[RAW_FIELDS["hours"]], errors="coerce").fillna(0.0),
+        "cost": pd.to_numeric(df[RAW_FIELDS["cost"]], errors="coerce").fillna(0.0),
+    })
+
+
+@traced("raw_pivot")
+def pivot_report(frame, category, date_from, date_to):
+    """
+    Rebuild the read_second_tab() frame from a records_frame(): one hours and
+    one cost row per section (sorted by name) and, like Odoo's report, one
+    column per day that has attendance, with or without OT.
+    """
+    days = pd.DatetimeIndex(frame["day"].unique()).sort_values()
+    sums = frame.groupby(["section", "day"])[["hours", "cost"]].sum()
+    hours = sums["hours"].unstack("day", fill_value=0.0).reindex(columns=days, fill_value=0.0)
+    cost = sums["cost"].unstack("day", fill_value=0.0).reindex(columns=days, fill_value=0.0)
+    sections = hours.index.tolist()
+
+    values = np.zeros((len(TOTAL_ROWS) + 2 * len(sections), len(days)))
+    body = values[len(TOTAL_ROWS):]
+    body[0::2] = hours.to_numpy()
+    body[1::2] = cost.to_numpy()
+
+    index = pd.MultiIndex.from_tuples(
+        TOTAL_ROWS + [(section, metric) for section in sections for metric in METRICS],
+        names=["section", "metric"])
+    table = pd.DataFrame(values, index=index, columns=days.strftime("%Y-%m-%d"))
+    layout = {"title": REPORT_TITLE, "category": category, "headings": HEADINGS}
+    return ot_history.build_report(layout, table, date_from, date_to)
+
+
+@retry()
+def fetch_raw_report(uid, company_id, category_id, date_from, date_to, row_limit=None):
+    """The report for one category, built from attendance records instead of the XLSX."""
+    category, records = fetch_records(uid, company_id, category_id, date_from, date_to)
+    df = pivot_report(records_frame(records), category, date_from, date_to)
+    df = df.head(row_limit) if row_limit is not None else df
+    print(f"✅ Built report from raw records: {df.shape}")
+    return df
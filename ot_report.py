@@ -0,0 +1,1124 @@
+import os
+import json
+import re
+import hashlib
+import time
+import random
+import string
+import itertools
+import warnings
+import threading
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from functools import wraps
+from collections import Counter
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import openpyxl
+import numpy as np
+import pandas as pd
+
+import gspread
+from oauth2client.service_account import ServiceAccountCredentials
+from gspread.exceptions import APIError
+from gspread.utils import extract_id_from_url
+
+import ot_trace
+from ot_trace import traced
+
+from dotenv import load_dotenv
+load_dotenv()
+
+# ===== Environment Variables =====
+ODOO_URL = os.getenv("ODOO_URL")
+USERNAME = os.getenv("ODOO_USERNAME")
+PASSWORD = os.getenv("ODOO_PASSWORD")
+DB = os.getenv("ODOO_DB")
+
+ODOO_TZ = "Asia/Dhaka"
+MODEL = "attendance.pdf.report"
+REPORT_BUTTON_METHOD = "action_generate_xlsx_report"
+CATEGORY_MODEL = os.getenv("ODOO_CATEGORY_MODEL", "hr.employee.category")   # the wizard's category_id
+
+REPORT_TYPE = "ot_analysis"        # e.g. "ot_analysis", "job_card"
+DATE_FROM = "2025-08-01"
+# "Yesterday" in Dhaka, not on the runner's (UTC) clock: the 02:10 run would
+# otherwise still be on the day before and report one day less than 10:00/11:00
+DATE_TO = (datetime.now(ZoneInfo(ODOO_TZ)) - timedelta(days=1)).strftime("%Y-%m-%d")
+
+# ===== Download =====
+XLSX_CONTENT_TYPES = ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                      "application/octet-stream")
+XLSX_MAGIC = b"PK\x03\x04"       # XLSX files are ZIP archives
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_PROGRESS_BYTES = 5 * 1024 * 1024
+
+# ===== Google Sheets =====
+SERVICE_ACCOUNT_JSON = "credentials.json"  # this file will exist in Actions
+SCOPE = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+SHEETS_SYNC = os.getenv("SHEETS_SYNC", "full")   # "full" = clear + rewrite, "diff" = changed cells only
+SHEETS_TOTALS = os.getenv("SHEETS_TOTALS", "formula")   # odd/even totals as "formula" or static "values"
+# Skip tabs whose final grid hashes the same as the last one we wrote there
+SHEETS_SKIP_UNCHANGED = os.getenv("SHEETS_SKIP_UNCHANGED", "0") == "1"
+SHEETS_HASHES = os.getenv("SHEETS_HASHES", ".sheets_hashes.json")
+# Per-user Sheets API quota (requests per minute), shared by all jobs in the process
+SHEETS_READS_PER_MINUTE = int(os.getenv("SHEETS_READS_PER_MINUTE", "60"))
+SHEETS_WRITES_PER_MINUTE = int(os.getenv("SHEETS_WRITES_PER_MINUTE", "60"))
+SHEETS_BURST = int(os.getenv("SHEETS_BURST", "10"))
+
+# Keep one wizard record per company for the whole run and write() each
+# category's values into it instead of web_save-ing a new one per report
+REUSE_WIZARD = os.getenv("ODOO_REUSE_WIZARD", "0") == "1"
+
+# Skip call_button() when the report name for MODEL/REPORT_BUTTON_METHOD is
+# already known from an earlier run and download the XLSX straight away
+DIRECT_DOWNLOAD = os.getenv("ODOO_DIRECT_DOWNLOAD", "0") == "1"
+REPORT_NAME_CACHE = os.getenv("ODOO_REPORT_NAME_CACHE", ".odoo_report_names.json")
+
+# ===== HTTP transport =====
+ODOO_POOL_SIZE = int(os.getenv("ODOO_POOL_SIZE", "10"))            # keep-alive connections kept per host
+ODOO_CONNECT_RETRIES = int(os.getenv("ODOO_CONNECT_RETRIES", "3"))  # transport-level, before @retry kicks in
+
+# ===== Session Cache =====
+# Off unless ODOO_SESSION_CACHE names a file: it holds a live session cookie and
+# CSRF token, so keep it on the machine that made it (never in a shared cache).
+SESSION_CACHE = os.getenv("ODOO_SESSION_CACHE", "")
+SESSION_TTL_HOURS = float(os.getenv("ODOO_SESSION_TTL_HOURS", "12"))
+
+# Field spec shared by onchange() and web_save()
+WIZARD_SPEC = {
+    "report_type": {}, "date_from": {}, "date_to": {}, "is_company": {},
+    "atten_type": {}, "types": {}, "mode_type": {},
+    "employee_id": {"fields": {"display_name": {}}},
+    "mode_company_id": {"fields": {"display_name": {}}},
+    "category_id": {"fields": {"display_name": {}}},
+    "department_id": {"fields": {"display_name": {}}},
+    "company_all": {}
+}
+
+# ========= START SESSION ==========
+session = requests.Session()
+session.headers.update({"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
+                        "Accept-Encoding": "gzip, deflate"})
+
+# Wall time to response headers and bytes per "METHOD /path", filled by a
+# session hook (streamed or chunked bodies without Content-Length count as 0)
+HTTP_TIMINGS = {}
+http_timings_lock = threading.Lock()
+transport = None
+
+
+def record_timing(r, *args, **kwargs):
+    key = f"{r.request.method} {urlsplit(r.request.url).path}"
+    seconds = r.elapsed.total_seconds()
+    with http_timings_lock:
+        stats = HTTP_TIMINGS.setdefault(key, {"requests": 0, "seconds": 0.0, "max_seconds": 0.0,
+                                              "bytes_sent": 0, "bytes_received": 0})
+        stats["requests"] += 1
+        stats["seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+        stats["bytes_sent"] += len(r.request.body or b"")
+        stats["bytes_received"] += int(r.headers.get("Content-Length") or 0)   # on the wire, i.e. gzipped
+
+
+def mount_transport(pool_size=ODOO_POOL_SIZE):
+    """
+    Mount a keep-alive pool of `pool_size` connections on the Odoo session.
+    urllib3 retries connection failures (nothing was sent yet) for every
+    method, but read errors and 502/503/504 only for idempotent ones, so a
+    JSON-RPC POST is never replayed behind our back.
+    """
+    global transport
+    retries = Retry(total=ODOO_CONNECT_RETRIES, connect=ODOO_CONNECT_RETRIES,
+                    read=ODOO_CONNECT_RETRIES, status=ODOO_CONNECT_RETRIES,
+                    status_forcelist=(502, 503, 504), backoff_factor=0.5, raise_on_status=False)
+    transport = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retries)
+    session.mount("https://", transport)
+    session.mount("http://", transport)
+    return transport
+
+
+def http_stats():
+    """Per-endpoint timings plus how many TCP connections served them."""
+    pools = transport.poolmanager.pools
+    connections = sum(pools[key].num_connections for key in pools.keys())
+    with http_timings_lock:
+        endpoints = {key: {**stats, "seconds": round(stats["seconds"], 3),
+                           "max_seconds": round(stats["max_seconds"], 3)}
+                     for key, stats in HTTP_TIMINGS.items()}
+    return {"connections": connections, "endpoints": endpoints}
+
+
+session.hooks["response"].append(record_timing)
+mount_transport()
+
+
+# Odoo round-trips per endpoint (retries included), for the end-of-run summary
+ODOO_RPC_CALLS = Counter()
+odoo_rpc_lock = threading.Lock()
+
+
+def count_rpc(name):
+    with odoo_rpc_lock:
+        ODOO_RPC_CALLS[name] += 1
+
+
+def odoo_rpc_stats():
+    with odoo_rpc_lock:
+        return dict(ODOO_RPC_CALLS)
+
+
+# ===== Retry Helpers =====
+def retry(max_attempts=5, base_delay=2, backoff=2,
+          allowed_exceptions=(requests.RequestException, RuntimeError, APIError)):
+    """
+    Retry decorator with exponential backoff + jitter.
+    Retries on network errors and custom exceptions.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            attempt = 1
+            while attempt <= max_attempts:
+                try:
+                    return func(*args, **kwargs)
+                except allowed_exceptions as e:
+                    wait_time = base_delay * (backoff ** (attempt - 1))
+                    wait_time += random.uniform(0, 1)  # jitter
+                    print(f"⚠️ {func.__name__} failed (attempt {attempt}/{max_attempts}): {e}")
+                    if attempt == max_attempts:
+                        raise
+                    ot_trace.add_retry(func.__name__)
+                    time.sleep(wait_time)
+                    attempt += 1
+        return wrapper
+    return decorator
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by every Sheets call of one kind. Callers
+    reserve a token up front and sleep until it is due, so parallel jobs pace
+    themselves to `per_minute` instead of bursting into 429s.
+    """
+
+    def __init__(self, name, per_minute, burst):
+        self.name = name
+        self.rate = per_minute / 60.0
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.throttled_seconds = 0.0
+        self.rate_limited = 0
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = max(-self.tokens / self.rate, self.blocked_until - now, 0.0)
+            self.calls += 1
+            self.throttled_seconds += wait
+        if wait > 0:
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Hold every caller back for `seconds` (server sent 429 / Retry-After)."""
+        with self.lock:
+            self.rate_limited += 1
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+SHEETS_READ = TokenBucket("read", SHEETS_READS_PER_MINUTE, SHEETS_BURST)
+SHEETS_WRITE = TokenBucket("write", SHEETS_WRITES_PER_MINUTE, SHEETS_BURST)
+
+
+def sheets_quota_stats():
+    return {bucket.name: {"calls": bucket.calls,
+                          "throttled_seconds": round(bucket.throttled_seconds, 2),
+                          "rate_limited": bucket.rate_limited}
+            for bucket in (SHEETS_READ, SHEETS_WRITE)}
+
+
+def retry_after(e):
+    """Seconds from a 429's Retry-After header, if the server sent one."""
+    response = getattr(e, "response", None)
+    value = response.headers.get("Retry-After") if response is not None else None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def safe_call(func, *args, retries=5, quota=SHEETS_WRITE, **kwargs):
+    """Call a Sheets API function through the `quota` bucket, backing off on 429."""
+    for attempt in range(1, retries + 1):
+        quota.acquire()
+        try:
+            return func(*args, **kwargs)
+        except APIError as e:
+            err_text = str(e)
+            if getattr(e, "code", None) == 429 or "429" in err_text or "quota" in err_text.lower():
+                sleep_time = retry_after(e) or min(2**attempt + random.random(), 60)
+                quota.pause(sleep_time)
+                ot_trace.add_retry(f"sheets_{quota.name}")
+                print(f"⚠️ Quota exceeded ({quota.name}). Retry {attempt}/{retries} in {sleep_time:.1f}s")
+            else:
+                raise
+    raise RuntimeError("❌ Max retries exceeded for Google Sheets API call")
+
+
+# ===== A1 notation =====
+MAX_SHEET_COLUMNS = 18278   # Google Sheets column limit (A … ZZZ)
+
+# 0-based column index ↔ letters, built once: 26 + 26² + 26³ = 18278 entries
+COLUMN_LETTERS = [
+    "".join(letters)
+    for width in (1, 2, 3)
+    for letters in itertools.product(string.ascii_uppercase, repeat=width)
+]
+COLUMN_INDEX = {letters: idx for idx, letters in enumerate(COLUMN_LETTERS)}
+A1_CELL = re.compile(r"^\$?([A-Za-z]{1,3})\$?(\d+)$")
+
+
+def col_letter(idx):
+    """Convert 0-based index to Excel-style letter (supports > Z)."""
+    if not 0 <= idx < MAX_SHEET_COLUMNS:
+        raise ValueError(f"Column index {idx} is outside the Sheets limit of {MAX_SHEET_COLUMNS} columns")
+    return COLUMN_LETTERS[idx]
+
+
+def col_index(letters):
+    """Inverse of col_letter(): 'A' → 0, 'AI' → 34."""
+    try:
+        return COLUMN_INDEX[letters.upper()]
+    except KeyError:
+        raise ValueError(f"Not a Sheets column: {letters!r}") from None
+
+
+def parse_a1(cell):
+    """'AI51' → (50, 34): 0-based (row, column) of a single A1 cell reference."""
+    m = A1_CELL.match(cell)
+    if not m or int(m.group(2)) < 1:
+        raise ValueError(f"Not an A1 cell reference: {cell!r}")
+    return int(m.group(2)) - 1, col_index(m.group(1))
+
+
+def odoo_context(uid, company_id, **extra):
+    context = {
+        "lang": "en_US", "tz": ODOO_TZ, "uid": uid,
+        "allowed_company_ids": [company_id], "default_is_company": False
+    }
+    context.update(extra)
+    return context
+
+
+def report_options(category_id, date_from=DATE_FROM, date_to=DATE_TO):
+    """Wizard values / download options for one category in category mode."""
+    return {
+        "date_from": date_from,
+        "date_to": date_to,
+        "mode_type": "category",
+        "mode_company_id": False,    # cleared in category mode
+        "department_id": False,
+        "category_id": category_id,
+        "employee_id": False,
+        "report_type": REPORT_TYPE,
+        "atten_type": False,
+        "types": False,
+        "is_company": False,
+        "company_all": "allcompany"
+    }
+
+
+def options_key(company_id, options):
+    """Stable short hash of everything that decides which report Odoo renders."""
+    blob = json.dumps({"company_id": company_id, "model": MODEL, **options}, sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode()).hexdigest()[:16]
+
+
+# ===== Odoo JSON-RPC client =====
+class OdooError(RuntimeError):
+    """A JSON-RPC "error" reply, decoded: server exception name, message and traceback."""
+
+    def __init__(self, error):
+        data = error.get("data") or {}
+        self.code = error.get("code")
+        self.name = data.get("name", "")
+        self.debug = data.get("debug", "")
+        self.message = data.get("message") or error.get("message") or "unknown error"
+        super().__init__(f"{self.name or 'Odoo error'}: {self.message}")
+
+
+class OdooRPC:
+    """
+    JSON-RPC client for Odoo. Every call takes the next id from one shared
+    sequence, the reply must echo it, and error replies are raised as
+    OdooError. The HTTP work runs on the shared keep-alive `session` (cookies,
+    pool, transport retries, timings); calls block, and parallelism comes from
+    the runner's worker threads.
+    """
+
+    def __init__(self, http):
+        self.http = http
+        self.ids = itertools.count(1)
+        self.ids_lock = threading.Lock()
+
+    def next_id(self):
+        with self.ids_lock:
+            return next(self.ids)
+
+    def call(self, path, params, timeout=60):
+        request_id = self.next_id()
+        payload = {"jsonrpc": "2.0", "method": "call", "params": params, "id": request_id}
+        r = self.http.post(f"{ODOO_URL}{path}", json=payload, timeout=timeout)
+        r.raise_for_status()
+        try:
+            reply = r.json()
+        except ValueError:
+            raise RuntimeError(f"{path}: not a JSON-RPC reply: {r.text[:200]!r}") from None
+        if reply.get("id") not in (request_id, None):
+            raise RuntimeError(f"{path}: reply id {reply.get('id')} does not match request {request_id}")
+        if "error" in reply:
+            raise OdooError(reply["error"])
+        return reply.get("result")
+
+    def call_kw(self, model, method, args, kwargs, timeout=60):
+        params = {"model": model, "method": method, "args": args, "kwargs": kwargs}
+        return self.call(f"/web/dataset/call_kw/{model}/{method}", params, timeout)
+
+    def call_button(self, model, method, args, kwargs, timeout=120):
+        params = {"model": model, "method": method, "args": args, "kwargs": kwargs}
+        return self.call("/web/dataset/call_button", params, timeout)
+
+
+rpc = OdooRPC(session)
+
+
+# ===== Odoo Functions =====
+@retry()
+@traced("login")
+def login():
+    count_rpc("login")
+    res = rpc.call("/web/session/authenticate", {"db": DB, "login": USERNAME, "password": PASSWORD})
+    uid = (res or {}).get("uid")
+    if not uid:
+        raise RuntimeError(f"Login failed: {res}")
+    print("✅ Logged in, UID =", uid)
+    return uid
+
+
+@retry()
+@traced()
+def get_csrf():
+    count_rpc("get_csrf")
+    r = session.get(f"{ODOO_URL}/web", timeout=60)
+    m = re.search(r'csrf_token\s*:\s*"([^"]+)"', r.text)
+    if not m:
+        raise RuntimeError("Could not extract CSRF token from /web")
+    csrf = m.group(1)
+    print("✅ CSRF token =", csrf)
+    return csrf
+
+
+def session_is_valid(uid):
+    """Cheap probe: does the current cookie still belong to `uid`?"""
+    count_rpc("session_info")
+    try:
+        res = rpc.call("/web/session/get_session_info", {}, timeout=30)
+        return (res or {}).get("uid") == uid
+    except (requests.RequestException, RuntimeError):
+        return False
+
+
+def load_cached_session():
+    """
+    Restore cookies + CSRF token saved by save_session() if they are for the
+    same server/user, not past their expiry and still accepted by Odoo.
+    """
+    if not SESSION_CACHE:
+        return None
+    try:
+        with open(SESSION_CACHE) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if (cached.get("url"), cached.get("db"), cached.get("login")) != (ODOO_URL, DB, USERNAME):
+        return None
+    if cached.get("expires_at", 0) < time.time():
+        print("⚠️ Cached Odoo session expired, logging in again")
+        return None
+
+    for cookie in cached.get("cookies", []):
+        session.cookies.set(cookie["name"], cookie["value"],
+                            domain=cookie["domain"], path=cookie["path"])
+    if not session_is_valid(cached["uid"]):
+        print("⚠️ Cached Odoo session rejected by server, logging in again")
+        session.cookies.clear()
+        return None
+    return cached["uid"], cached["csrf"]
+
+
+def save_session(uid, csrf):
+    cached = {
+        "url": ODOO_URL, "db": DB, "login": USERNAME,
+        "uid": uid, "csrf": csrf,
+        "expires_at": time.time() + SESSION_TTL_HOURS * 3600,
+        "cookies": [{"name": c.name, "value": c.value, "domain": c.domain, "path": c.path}
+                    for c in session.cookies],
+    }
+    tmp_path = f"{SESSION_CACHE}.tmp"
+    with open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as f:
+        json.dump(cached, f)
+    os.replace(tmp_path, SESSION_CACHE)
+
+
+def ensure_session():
+    """Return (uid, csrf), reusing the on-disk session when it is still good."""
+    cached = load_cached_session()
+    if cached:
+        print("✅ Reusing cached Odoo session, UID =", cached[0])
+        return cached
+    uid = login()
+    csrf = get_csrf()
+    if not SESSION_CACHE:
+        return uid, csrf
+    try:
+        save_session(uid, csrf)
+    except OSError as e:
+        print(f"⚠️ Could not cache Odoo session: {e}")
+    return uid, csrf
+
+
+@retry()
+@traced("onchange")
+def onchange(uid, company_id):
+    count_rpc("onchange")
+    res = rpc.call_kw(MODEL, "onchange", [[], {}, [], WIZARD_SPEC],
+                      {"context": odoo_context(uid, company_id)})
+    val = (res or {}).get("value", {})
+    print("✅ Onchange defaults:", val)
+    return val
+
+
+@retry()
+@traced("web_save")
+def web_save(uid, company_id, options):
+    count_rpc("web_save")
+    res = rpc.call_kw(MODEL, "web_save", [[], options],
+                      {"context": odoo_context(uid, company_id), "specification": WIZARD_SPEC})
+    wizard_id = (res or [{}])[0].get("id")
+    if not wizard_id:
+        raise RuntimeError(f"Wizard save failed: {res}")
+    print("✅ Wizard saved, ID =", wizard_id)
+    return wizard_id
+
+
+@retry(max_attempts=2)
+@traced("write_wizard")
+def write_wizard(uid, company_id, wizard_id, values):
+    """Update an existing wizard in place; only the changed fields are sent."""
+    count_rpc("write")
+    res = rpc.call_kw(MODEL, "write", [[wizard_id], values], {"context": odoo_context(uid, company_id)})
+    if res is not True:
+        raise RuntimeError(f"Wizard write failed: {res}")
+    print(f"✅ Wizard {wizard_id} updated: {', '.join(values)}")
+
+
+class WizardPool:
+    """
+    One wizard record per company, reused within a run. A job checks its
+    company's wizard out for the whole render and other jobs of that company
+    wait for it, so parallel runs never create a second wizard; reports of
+    one company are rendered one at a time. The wizard remembers the values
+    last saved on it so only the differences are written.
+    """
+
+    def __init__(self):
+        self.wizards = {}   # company_id → (wizard_id, values)
+        self.busy = set()   # companies whose wizard is checked out
+        self.cond = threading.Condition()
+
+    def checkout(self, uid, company_id, options):
+        """
+        The company's wizard id holding `options`, updated via write(), or a
+        new one. Blocks while another job has it; release() it when done.
+        """
+        with self.cond:
+            while company_id in self.busy:
+                self.cond.wait()
+            self.busy.add(company_id)
+            wizard_id, saved = self.wizards.get(company_id, (None, None))
+        try:
+            return self.prepare(uid, company_id, options, wizard_id, saved)
+        except BaseException:
+            with self.cond:   # the wizard's state is unknown now: start afresh next time
+                self.wizards.pop(company_id, None)
+            self.release(company_id, None, None)
+            raise
+
+    def prepare(self, uid, company_id, options, wizard_id, saved):
+        if wizard_id is None:
+            return web_save(uid, company_id, options)
+        changes = {key: value for key, value in options.items() if saved.get(key) != value}
+        if not changes:
+            print(f"✅ Wizard {wizard_id} already holds these options")
+            return wizard_id
+        try:
+            write_wizard(uid, company_id, wizard_id, changes)
+        except (requests.RequestException, RuntimeError) as e:
+            print(f"⚠️ Could not reuse wizard {wizard_id} ({e}), creating a new one")
+            return web_save(uid, company_id, options)
+        return wizard_id
+
+    def release(self, company_id, wizard_id, options):
+        with self.cond:
+            if wizard_id is not None:
+                self.wizards[company_id] = (wizard_id, dict(options))
+            self.busy.discard(company_id)
+            self.cond.notify_all()
+
+
+@retry()
+@traced("call_button")
+def call_button(uid, company_id, wizard_id):
+    count_rpc("call_button")
+    res = rpc.call_button(MODEL, REPORT_BUTTON_METHOD, [[wizard_id]],
+                                {"context": odoo_context(uid, company_id)})
+    report_name = (res or {}).get("report_name")
+    if not report_name:
+        raise RuntimeError(f"Report button did not return report_name: {res}")
+    print("✅ Report generated:", report_name)
+    return report_name
+
+
+@retry(max_attempts=2)
+@traced("freshness_probe")
+def latest_attendance_write(uid, company_id, date_to):
+    """
+    write_date of the most recently changed hr.attendance that falls inside the
+    report (check-in up to the end of `date_to`, local time): a cheap signal
+    that a cached report for this company is still current.
+    """
+    count_rpc("search_read")
+    day_end = datetime.strptime(f"{date_to} 23:59:59", "%Y-%m-%d %H:%M:%S").replace(tzinfo=ZoneInfo(ODOO_TZ))
+    cutoff = day_end.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    res = rpc.call_kw("hr.attendance", "search_read", [[["check_in", "<=", cutoff]]], {
+        "fields": ["write_date"], "order": "write_date desc", "limit": 1,
+        "context": odoo_context(uid, company_id),
+    })
+    return res[0]["write_date"] if res else None
+
+
+@retry()
+@traced("category_names")
+def category_names(uid, company_id, category_ids):
+    """{category id: display name}, the label each category's block starts with."""
+    count_rpc("read")
+    res = rpc.call_kw(CATEGORY_MODEL, "read", [list(category_ids), ["display_name"]],
+                      {"context": odoo_context(uid, company_id)})
+    return {record["id"]: record["display_name"] for record in res or []}
+
+
+# ===== Report name cache =====
+report_names = None   # {"<url>|<db>|<model>.<method>": report_name}, loaded on first use
+report_names_lock = threading.Lock()
+
+
+def report_name_key():
+    return f"{ODOO_URL}|{DB}|{MODEL}.{REPORT_BUTTON_METHOD}"
+
+
+def load_report_names():
+    global report_names
+    if report_names is None:
+        try:
+            with open(REPORT_NAME_CACHE) as f:
+                report_names = json.load(f)
+        except (OSError, ValueError):
+            report_names = {}
+    return report_names
+
+
+def save_report_names():
+    tmp_path = f"{REPORT_NAME_CACHE}.tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(report_names, f, indent=2)
+        os.replace(tmp_path, REPORT_NAME_CACHE)
+    except OSError as e:
+        print(f"⚠️ Could not cache report name: {e}")
+
+
+def cached_report_name():
+    with report_names_lock:
+        return load_report_names().get(report_name_key())
+
+
+def remember_report_name(report_name):
+    with report_names_lock:
+        if load_report_names().get(report_name_key()) != report_name:
+            report_names[report_name_key()] = report_name
+            save_report_names()
+
+
+def forget_report_name():
+    with report_names_lock:
+        if load_report_names().pop(report_name_key(), None):
+            save_report_names()
+
+
+def render_xlsx(uid, csrf_token, company_id, options, wizard_id, direct=DIRECT_DOWNLOAD):
+    """
+    Generate and download the report for a saved wizard. With `direct`, a cached
+    report name skips call_button() and goes straight to the download, tried
+    once; on a miss or any failure the button is pressed as before.
+    """
+    report_name = cached_report_name() if direct else None
+    if report_name:
+        try:
+            return download_xlsx.__wrapped__(uid, csrf_token, company_id, options, wizard_id, report_name)
+        except (requests.RequestException, RuntimeError) as e:
+            print(f"⚠️ Direct download as {report_name} failed ({e}), generating via the report button")
+            forget_report_name()
+    report_name = call_button(uid, company_id, wizard_id)
+    remember_report_name(report_name)
+    return download_xlsx(uid, csrf_token, company_id, options, wizard_id, report_name)
+
+
+def xlsx_filename(company_id, options):
+    return (f"{options['report_type']}_{options['date_from']}_to_{options['date_to']}"
+            f"_co{company_id}_cat{options['category_id']}.xlsx")
+
+
+def stream_to_file(chunks, path, total=0):
+    """
+    Write an XLSX byte stream to `path` via a temporary file and an atomic
+    rename, so a failed download never leaves a truncated workbook behind.
+    Returns the number of bytes written.
+    """
+    tmp_path = f"{path}.part"
+    size = 0
+    next_progress = DOWNLOAD_PROGRESS_BYTES
+    try:
+        with open(tmp_path, "wb") as f:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                if size == 0 and not chunk.startswith(XLSX_MAGIC):
+                    raise RuntimeError(f"Download failed: response is not an XLSX file: {chunk[:200]!r}")
+                f.write(chunk)
+                size += len(chunk)
+                if size >= next_progress:
+                    of_total = f" / {total / 1048576:.1f} MiB" if total else ""
+                    print(f"⬇️ {path}: {size / 1048576:.1f} MiB{of_total}")
+                    next_progress += DOWNLOAD_PROGRESS_BYTES
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return size
+
+
+@retry()
+@traced()
+def download_xlsx(uid, csrf_token, company_id, options, wizard_id, report_name, xlsx_path=None):
+    count_rpc("download")
+    xlsx_path = xlsx_path or xlsx_filename(company_id, options)
+    download_url = f"{ODOO_URL}/report/download"
+    context = odoo_context(uid, company_id, active_model=MODEL,
+                           active_id=wizard_id, active_ids=[wizard_id])
+    report_path = f"/report/xlsx/{report_name}?options={json.dumps(options)}&context={json.dumps(context)}"
+    payload = {
+        "data": json.dumps([report_path, "xlsx"]),
+        "context": json.dumps(context),
+        "token": "dummy-because-api-expects-one",
+        "csrf_token": csrf_token
+    }
+    headers = {"X-CSRF-Token": csrf_token, "Referer": f"{ODOO_URL}/web"}
+
+    started = time.perf_counter()
+    with session.post(download_url, data=payload, headers=headers, timeout=180, stream=True) as r:
+        r.raise_for_status()
+        ctype = r.headers.get("content-type", "").lower()
+        if not any(t in ctype for t in XLSX_CONTENT_TYPES):
+            raise RuntimeError(f"Download failed: {r.status_code} {ctype} {r.text[:400]}")
+        total = int(r.headers.get("content-length") or 0)
+        size = stream_to_file(r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE), xlsx_path, total)
+    ot_trace.add_bytes("download_xlsx", size)
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Report downloaded as {xlsx_path} "
+          f"({size / 1024:.0f} KiB in {elapsed:.1f}s, {size / 1024 / max(elapsed, 1e-6):.0f} KiB/s)")
+    return xlsx_path
+
+
+def xlsx_cell(value):
+    """Match pd.read_excel: empty → NaN, integral floats → int."""
+    if value is None:
+        return float("nan")
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+@traced()
+def read_second_tab(xlsx_path: str, row_limit=None) -> pd.DataFrame:
+    """
+    Reads ONLY the 2nd worksheet (index=1) from the downloaded Excel file,
+    streaming it in read-only mode and stopping after `row_limit` data rows.
+    Gives the same frame as pd.read_excel(xlsx_path, sheet_name=1).head(row_limit).
+    """
+    ot_trace.add_bytes("read_second_tab", os.path.getsize(xlsx_path))
+    wb = openpyxl.load_workbook(xlsx_path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[1]   # 0-based index → second tab
+        max_row = row_limit + 1 if row_limit is not None else None
+        rows = ws.iter_rows(max_row=max_row, values_only=True)
+        header = next(rows, ())
+        data = [[xlsx_cell(v) for v in row] for row in rows]
+    finally:
+        wb.close()
+
+    # pandas drops trailing blank rows
+    while data and all(v is None or v != v for v in data[-1]):
+        data.pop()
+
+    columns = []
+    for i, name in enumerate(header):
+        name = f"Unnamed: {i}" if name is None else name
+        dup = 0
+        while (f"{name}.{dup}" if dup else name) in columns:
+            dup += 1
+        columns.append(f"{name}.{dup}" if dup else name)
+
+    df = pd.DataFrame(data, columns=columns)
+    print(f"✅ Loaded 2nd tab into DataFrame: {df.shape}")
+    return df
+
+
+# ===== Google Sheets Functions =====
+def authorize_gspread():
+    creds = ServiceAccountCredentials.from_json_keyfile_name(SERVICE_ACCOUNT_JSON, SCOPE)
+    gc = gspread.authorize(creds)
+    gc.http_client.session.hooks["response"].append(record_timing)
+    print("✅ Authorized Google Sheets client")
+    return gc
+
+
+def sumproduct_formulas(num_cols, row_limit, start_col_idx=3):
+    """
+    Odd-row (OT hours) and even-row (OT cost) totals per date column,
+    e.g. rows 7..47 / 8..48 for a 47-row paste.
+    """
+    odd_row = []
+    even_row = []
+    for c in range(start_col_idx, num_cols):
+        col = col_letter(c)
+        odd_row.append(f"=SUMPRODUCT((MOD(ROW({col}7:{col}{row_limit}),2)=1)*{col}7:{col}{row_limit})")
+        even_row.append(f"=SUMPRODUCT((MOD(ROW({col}8:{col}{row_limit + 1}),2)=0)*{col}8:{col}{row_limit + 1})")
+    return odd_row, even_row
+
+
+def alternating_row_totals(grid, row_limit, start_col_idx=3):
+    """
+    What the SUMPRODUCT formulas evaluate to, computed from the cleaned grid:
+    per column, the sum of odd sheet rows 7..row_limit and of even rows
+    8..row_limit+1. Sheet row r is grid row r-2 (row 1 is the header);
+    non-numeric cells count as 0, as they do in SUMPRODUCT.
+    """
+    block = grid[5:row_limit, start_col_idx:]
+    numbers = pd.to_numeric(pd.Series(block.ravel(), dtype=object), errors="coerce")
+    numbers = numbers.fillna(0).to_numpy(dtype=float).reshape(block.shape)
+    sheet_rows = np.arange(7, 7 + len(block))
+    odd = (sheet_rows % 2 == 1) & (sheet_rows <= row_limit)
+    even = (sheet_rows % 2 == 0) & (sheet_rows <= row_limit + 1)
+    return numbers[odd].sum(axis=0).tolist(), numbers[even].sum(axis=0).tolist()
+
+
+@traced()
+def sheet_values(df: pd.DataFrame, row_limit, formula_rows, totals=SHEETS_TOTALS, row4_format=None):
+    """
+    The grid written to the tab: header + first `row_limit` rows of the report,
+    then the odd/even-row totals in `formula_rows` (odd row, even row), either
+    as SUMPRODUCT formulas or, with totals="values", as precomputed numbers.
+    `row4_format` is the strptime format row 4 is parsed with (None = infer).
+    """
+    df = df.head(row_limit)
+    grid = df.to_numpy(dtype=object, copy=True)   # the only full copy of the data
+
+    # --- Convert row 4 (index 3) to string safely ---
+    if len(grid) > 3:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=UserWarning)
+            row4 = pd.to_datetime(pd.Series(grid[3], dtype=object), errors='coerce',
+                                  format=row4_format)  # invalids → NaT
+        grid[3] = row4.dt.strftime(ROW4_DATE_FORMAT).fillna("").to_numpy(dtype=object)
+
+    # --- Blank out NaN/None/NaT and inf/-inf in one masked assignment ---
+    with np.errstate(invalid="ignore"):
+        grid[pd.isna(grid) | (grid == np.inf) | (grid == -np.inf)] = ""
+
+    start_col_idx = 3
+    num_cols = df.shape[1]
+    if totals == "values":
+        odd_row, even_row = alternating_row_totals(grid, row_limit, start_col_idx)
+    else:
+        odd_row, even_row = sumproduct_formulas(num_cols, row_limit, start_col_idx)
+
+    values = [list(df.columns)] + grid.tolist()
+    if odd_row:
+        values += [[""] * num_cols] * (formula_rows[0] - 1 - len(values))
+        values.append([""] * start_col_idx + odd_row)
+        values.append([""] * start_col_idx + even_row)
+    return values
+
+
+SHEETS_EPOCH = datetime(1899, 12, 30)   # day 0 of Sheets date serials
+ROW4_DATE_FORMAT = "%d-%b-%y"            # how sheet_values() writes the row-4 dates
+
+
+def date_serial(value):
+    """
+    A sheet_values() row-4 date string ("01-Aug-25") as a Sheets date serial,
+    else None. USER_ENTERED stores those strings as dates, which come back as
+    serials when the tab is read.
+    """
+    if not isinstance(value, str) or len(value) != 9 or value[2] != "-":
+        return None
+    try:
+        return (datetime.strptime(value, ROW4_DATE_FORMAT) - SHEETS_EPOCH).days
+    except ValueError:
+        return None
+
+
+def same_cell(old, new):
+    """
+    Sheets hands numbers back unformatted, so 2.5 == "2.5" == 2.50, and dates
+    as serials, so 45870 == "01-Aug-25".
+    """
+    if old == new:
+        return True
+    serial = date_serial(new)
+    if serial is not None:
+        new = serial
+    try:
+        return float(old) == float(new)
+    except (TypeError, ValueError):
+        return False
+
+
+def changed_ranges(old, new, max_gap=3):
+    """
+    (row, col, values) blocks covering every cell where grid `new` differs from grid
+    `old`. Changed runs within a row are merged with identical runs up to
+    `max_gap` rows below (re-sending the unchanged cells in between), so a new
+    date column becomes one tall range instead of one per row.
+    """
+    num_rows = max(len(old), len(new))
+    num_cols = max([len(row) for row in old + new] or [0])
+
+    def at(grid, r, c):
+        return grid[r][c] if r < len(grid) and c < len(grid[r]) else ""
+
+    blocks = []        # [first_col, last_col, top_row, bottom_row]
+    open_blocks = {}   # (first_col, last_col) → block still growing downwards
+    for r in range(num_rows):
+        c = 0
+        while c < num_cols:
+            if same_cell(at(old, r, c), at(new, r, c)):
+                c += 1
+                continue
+            first = c
+            while c < num_cols and not same_cell(at(old, r, c), at(new, r, c)):
+                c += 1
+            block = open_blocks.get((first, c - 1))
+            if block and r - block[3] <= max_gap + 1:
+                block[3] = r
+            else:
+                block = [first, c - 1, r, r]
+                open_blocks[(first, c - 1)] = block
+                blocks.append(block)
+
+    return [
+        (top, first, [[at(new, r, c) for c in range(first, last + 1)] for r in range(top, bottom + 1)])
+        for first, last, top, bottom in blocks
+    ]
+
+
+def value_range(ws, row, col, values):
+    """One ValueRange of a values batchUpdate: `values` with its top-left cell at (row, col), 0-based."""
+    last_row = row + len(values)
+    last_col = col + max(len(r) for r in values) - 1
+    return {"range": f"'{ws.title}'!{col_letter(col)}{row + 1}:{col_letter(last_col)}{last_row}",
+            "values": values}
+
+
+def row4_date_format_request(sheet_id, num_cols):
+    """Row 4 from column D to the last column as dd-mm-yyyy dates."""
+    return {"repeatCell": {
+        "range": {"sheetId": sheet_id, "startRowIndex": 3, "endRowIndex": 4,
+                  "startColumnIndex": 3, "endColumnIndex": num_cols},
+        "cell": {"userEnteredFormat": {"numberFormat": {"type": "DATE", "pattern": "dd-mm-yyyy"}}},
+        "fields": "userEnteredFormat.numberFormat",
+    }}
+
+
+def sheet_requests(ws, num_rows, num_cols, clear=False):
+    """
+    spreadsheets.batchUpdate requests that grow the tab if needed, optionally
+    clear its values and date-format row 4. The values themselves go out in
+    the values batchUpdate, as USER_ENTERED.
+    """
+    sheet_id = ws.id
+    requests = []
+    if num_rows > ws.row_count or num_cols > ws.col_count:
+        requests.append({"updateSheetProperties": {
+            "properties": {"sheetId": sheet_id, "gridProperties": {
+                "rowCount": max(num_rows, ws.row_count), "columnCount": max(num_cols, ws.col_count)}},
+            "fields": "gridProperties(rowCount,columnCount)",
+        }})
+    if clear:
+        requests.append({"updateCells": {"range": {"sheetId": sheet_id}, "fields": "userEnteredValue"}})
+    if num_cols > 3:
+        requests.append(row4_date_format_request(sheet_id, num_cols))
+    return requests
+
+
+def full_range(ws):
+    return f"'{ws.title}'!A1:{col_letter(ws.col_count - 1)}{ws.row_count}"
+
+
+def tab_requests(ws, values, current=None):
+    """
+    (batchUpdate requests, value ranges, log summary) for one tab. With
+    `current` (the tab's FORMULA-rendered values) only changed cells are sent;
+    otherwise the tab is cleared and rewritten.
+    """
+    num_rows, num_cols = len(values), len(values[0])
+    if current is not None:
+        blocks = changed_ranges([list(row) for row in current], values)
+        cells = sum(len(v) * len(v[0]) for _, _, v in blocks)
+        return (sheet_requests(ws, num_rows, num_cols),
+                [value_range(ws, row, col, v) for row, col, v in blocks],
+                f"{cells} changed cell(s) in {len(blocks)} range(s)")
+    return (sheet_requests(ws, num_rows, num_cols, clear=True),
+            [value_range(ws, 0, 0, values)],
+            f"{num_rows} rows incl. header + formulas")
+
+
+@traced("sheets_write")
+def write_batch(sh, requests, data):
+    """
+    One spreadsheets.batchUpdate (grow, clear, row-4 format) and then one
+    values batchUpdate per spreadsheet. The values go in USER_ENTERED, as
+    the per-tab scripts wrote them, so Sheets parses dates, numbers and
+    formulas. Payload size goes to the trace.
+    """
+    body = {"requests": requests}
+    values_body = {"valueInputOption": "USER_ENTERED", "data": data}
+    ot_trace.add_bytes("sheets_write", len(json.dumps(body)) + len(json.dumps(values_body)))
+    if requests:
+        safe_call(sh.batch_update, body)
+    if data:
+        safe_call(sh.values_batch_update, values_body)
+
+
+def normalized_cell(value):
+    """Integral floats as ints and other floats to 9 places, so 2.0 and 2 hash alike."""
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else round(value, 9)
+    return value
+
+
+def grid_hash(values):
+    """Content hash of the grid a tab is about to receive."""
+    rows = [[normalized_cell(v) for v in row] for row in values]
+    return hashlib.sha256(json.dumps(rows, separators=(",", ":"), default=str).encode()).hexdigest()
+
+
+def load_sheet_hashes():
+    try:
+        with open(SHEETS_HASHES) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_sheet_hashes(updates):
+    hashes = load_sheet_hashes()
+    hashes.update(updates)
+    with open(f"{SHEETS_HASHES}.tmp", "w") as f:
+        json.dump(hashes, f, indent=2)
+    os.replace(f"{SHEETS_HASHES}.tmp", SHEETS_HASHES)
+
+
+@traced()
+def write_spreadsheet(gc, sheet_url, tabs, sync=SHEETS_SYNC, totals=SHEETS_TOTALS,
+                      skip_unchanged=SHEETS_SKIP_UNCHANGED):
+    """
+    Write several tabs of one spreadsheet with one metadata fetch, one
+    values batchGet (diff mode only), one spreadsheets.batchUpdate and one
+    values batchUpdate.
+    `tabs` is a list of (sheet_name, df, row_limit, formula_rows, row4_format). With
+    `skip_unchanged`, tabs whose grid hash matches the last write are left
+    alone, and a spreadsheet with nothing new is not even opened. Returns the
+    names of the skipped tabs.
+    """
+    grids = {name: sheet_values(df, row_limit, formula_rows, totals, row4_format)
+             for name, df, row_limit, formula_rows, row4_format in tabs}
+    sheet_id = extract_id_from_url(sheet_url)
+    keys = {name: f"{sheet_id}/{name}" for name in grids}
+    hashes = {name: grid_hash(values) for name, values in grids.items()}
+    skipped = []
+    if skip_unchanged:
+        stored = load_sheet_hashes()
+        for name in list(grids):
+            last = stored.get(keys[name], {})
+            if last.get("hash") == hashes[name]:
+                print(f"⏭️ {name}: content unchanged since {last['written_at']}, not written")
+                skipped.append(name)
+                del grids[name]
+        if not grids:
+            return skipped
+
+    with ot_trace.stage("sheets_open"):
+        sh = safe_call(gc.open_by_url, sheet_url, quota=SHEETS_READ)
+        worksheets = {ws.title: ws for ws in safe_call(sh.worksheets, quota=SHEETS_READ)}
+    missing = [name for name in grids if name not in worksheets]
+    if missing:
+        raise RuntimeError(f"Worksheet(s) {missing} not found in {sh.title}")
+
+    grids = [(worksheets[name], values) for name, values in grids.items()]
+    currents = [None] * len(grids)
+    if sync == "diff":
+        with ot_trace.stage("sheets_read"):
+            res = safe_call(sh.values_batch_get, [full_range(ws) for ws, _ in grids],
+                            params={"valueRenderOption": "FORMULA"}, quota=SHEETS_READ)
+        currents = [vr.get("values", []) for vr in res["valueRanges"]]
+
+    requests, data = [], []
+    for (ws, values), current in zip(grids, currents):
+        tab, ranges, summary = tab_requests(ws, values, current)
+        requests += tab
+        data += ranges
+        print(f"✅ {ws.title}: {summary} + row 4 date format")
+    write_batch(sh, requests, data)
+    print(f"✅ Wrote {len(grids)} tab(s) of {sh.title} in 1 batchUpdate + 1 values batchUpdate")
+
+    written_at = datetime.now().isoformat(timespec="seconds")
+    try:
+        save_sheet_hashes({keys[ws.title]: {"hash": hashes[ws.title], "written_at": written_at}
+                           for ws, _ in grids})
+    except OSError as e:
+        print(f"⚠️ Could not save sheet hashes: {e}")
+    return skipped
@@ -0,0 +1,81 @@
+import os
+import json
+import time
+import threading
+from functools import wraps
+from contextlib import contextmanager
+
+# ===== Run trace =====
+TRACE_DIR = os.getenv("OT_TRACE_DIR", "traces")   # one JSON summary per run, for day-to-day comparison
+
+STAGES = {}   # stage name → wall time, bytes, retries and error counts for this process
+stages_lock = threading.Lock()
+
+
+def stage_stats(name):
+    """The counters for `name`; caller holds stages_lock."""
+    return STAGES.setdefault(name, {"calls": 0, "seconds": 0.0, "max_seconds": 0.0,
+                                    "bytes": 0, "retries": 0, "errors": 0})
+
+
+def record(name, seconds, error=False):
+    with stages_lock:
+        stats = stage_stats(name)
+        stats["calls"] += 1
+        stats["seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+        stats["errors"] += bool(error)
+
+
+def add_bytes(name, nbytes):
+    with stages_lock:
+        stage_stats(name)["bytes"] += nbytes
+
+
+def add_retry(name):
+    with stages_lock:
+        stage_stats(name)["retries"] += 1
+
+
+@contextmanager
+def stage(name):
+    """Time the enclosed block as one call of `name`; exceptions count as errors."""
+    started = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        record(name, time.perf_counter() - started, failed)
+
+
+def traced(name=None):
+    """Decorator form of stage()."""
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def stage_summary():
+    with stages_lock:
+        return {name: {**stats, "seconds": round(stats["seconds"], 3),
+                       "max_seconds": round(stats["max_seconds"], 3)}
+                for name, stats in STAGES.items()}
+
+
+def write_summary(summary, trace_dir=TRACE_DIR):
+    """Write `summary` plus the stage table to trace_dir/run_<timestamp>.json; returns the path."""
+    os.makedirs(trace_dir, exist_ok=True)
+    path = os.path.join(trace_dir, f"run_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(f"{path}.tmp", "w") as f:
+        json.dump({**summary, "stages": stage_summary()}, f, indent=2, default=str)
+    os.replace(f"{path}.tmp", path)
+    return path
@@ -0,0 +1,451 @@
+import os
+import json
+import time
+import argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import ot_report
+import ot_history
+import ot_trace
+import ot_cache
+import ot_raw
+from ot_cache import ReportCache
+from ot_report import (
+    ensure_session, onchange, web_save, render_xlsx, report_options,
+    read_second_tab, authorize_gspread, write_spreadsheet,
+    WizardPool, latest_attendance_write,
+)
+from gspread.utils import extract_id_from_url
+
+# Declarative job table, loaded and validated once per run (see load_jobs)
+DEFAULT_JOBS_FILE = os.getenv("REPORT_JOBS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "jobs.json"))
+
+# Odoo reports rendered at once; 1 keeps the old strictly sequential behaviour
+DEFAULT_WORKERS = int(os.getenv("REPORT_WORKERS", "1"))
+# Only fetch days missing from the local history (see ot_history.py)
+DEFAULT_INCREMENTAL = os.getenv("OT_INCREMENTAL", "0") == "1"
+# "xlsx" = Odoo renders the report, "raw" = pivot attendance records locally (see ot_raw.py)
+DEFAULT_SOURCE = os.getenv("OT_SOURCE", "xlsx")
+
+# ===== Job spec =====
+JOB_FIELDS = {
+    "name": str,
+    "company_id": int,        # 1 = Zipper, 3 = Metal Trims, 4 = Contractor
+    "category_id": int,
+    "spreadsheet": str,       # key into the spec's "spreadsheets" table
+    "sheet_name": str,
+    "row_limit": int,         # report rows pasted below the header
+    "formula_rows": list,     # [odd-row totals, even-row totals], below the pasted rows
+}
+OPTIONAL_JOB_FIELDS = {
+    "label": str,
+    "row4_format": str,       # strptime format for the row-4 dates; cells that don't match stay blank
+}
+MIN_ROW_LIMIT = 8             # the totals sum rows 7..row_limit / 8..row_limit+1
+
+
+def job_errors(job, spreadsheets):
+    """Everything wrong with one job entry, as a list of messages."""
+    if not isinstance(job, dict):
+        return ["not an object"]
+    errors = [f"missing {key!r}" for key in JOB_FIELDS if key not in job]
+    errors += [f"unknown key {key!r}" for key in job if key not in JOB_FIELDS and key not in OPTIONAL_JOB_FIELDS]
+    for key, kind in {**JOB_FIELDS, **OPTIONAL_JOB_FIELDS}.items():
+        value = job.get(key)
+        if key in job and (not isinstance(value, kind) or isinstance(value, bool)):
+            errors.append(f"{key!r} must be {kind.__name__}, got {value!r}")
+    if errors:
+        return errors
+
+    for key in ("company_id", "category_id"):
+        if job[key] <= 0:
+            errors.append(f"{key!r} must be positive, got {job[key]}")
+    if job["spreadsheet"] not in spreadsheets:
+        errors.append(f"unknown spreadsheet {job['spreadsheet']!r}; known: {sorted(spreadsheets)}")
+    if job["row_limit"] < MIN_ROW_LIMIT:
+        errors.append(f"'row_limit' must be at least {MIN_ROW_LIMIT}, got {job['row_limit']}")
+
+    rows = job["formula_rows"]
+    if len(rows) != 2 or not all(isinstance(r, int) and not isinstance(r, bool) for r in rows):
+        errors.append(f"'formula_rows' must be two row numbers, got {rows!r}")
+    elif rows[1] != rows[0] + 1:
+        errors.append(f"'formula_rows' must be consecutive, got {rows!r}")
+    elif rows[0] <= job["row_limit"] + 1:
+        errors.append(f"'formula_rows' {rows!r} overlap the pasted rows 1..{job['row_limit'] + 1}")
+    return errors
+
+
+def load_jobs(path=DEFAULT_JOBS_FILE):
+    """
+    Read and validate the JSON job spec. Every problem is reported at once, before
+    any Odoo or Sheets call; each returned job carries its resolved `sheet_url`.
+    """
+    try:
+        with open(path) as f:
+            spec = json.load(f)
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"❌ Cannot read job spec {path}: {e}")
+
+    spreadsheets = spec.get("spreadsheets") if isinstance(spec, dict) else None
+    entries = spec.get("jobs") if isinstance(spec, dict) else None
+    if not isinstance(spreadsheets, dict) or not isinstance(entries, list) or not entries:
+        raise SystemExit(f"❌ Job spec {path} needs a \"spreadsheets\" object and a non-empty \"jobs\" list")
+
+    errors = []
+    sheet_ids = {}
+    for key, url in spreadsheets.items():
+        try:
+            sheet_ids[key] = extract_id_from_url(url)
+        except Exception:
+            errors.append(f"spreadsheet {key!r}: not a Google Sheets URL: {url!r}")
+
+    jobs, names, targets = [], set(), {}
+    for i, job in enumerate(entries):
+        label = job.get("name", f"#{i}") if isinstance(job, dict) else f"#{i}"
+        problems = job_errors(job, spreadsheets)
+        if isinstance(job, dict) and all(isinstance(job.get(k), str) for k in ("name", "spreadsheet", "sheet_name")):
+            if job.get("name") in names:
+                problems.append("duplicate job name")
+            names.add(job.get("name"))
+            target = (sheet_ids.get(job.get("spreadsheet")), job.get("sheet_name"))
+            if target[0] and target in targets:
+                problems.append(f"writes the same tab as {targets[target]}")
+            targets.setdefault(target, label)
+        errors += [f"job {label}: {problem}" for problem in problems]
+        if not problems:
+            jobs.append({**job, "sheet_url": spreadsheets[job["spreadsheet"]]})
+
+    if errors:
+        raise SystemExit(f"❌ Invalid job spec {path}:\n" + "\n".join(f"   - {e}" for e in errors))
+    return jobs
+
+
+def render_report(uid, csrf, company_id, options, date_to, row_limit=None, wizards=None,
+                  direct=ot_report.DIRECT_DOWNLOAD, cache=None):
+    """
+    Save the wizard, render, download and parse the XLSX for one set of options.
+    With a WizardPool the company's existing wizard is updated instead of
+    creating a new record per report; `direct` skips the report button when
+    the report name is cached. A fresh entry in the ReportCache `cache` skips
+    Odoo altogether.
+    """
+    date_from = options["date_from"]
+    key = ot_cache.cache_key(company_id, options)
+    if cache is not None:
+        df = cache.get(key, company_id, date_from, date_to, row_limit)
+        if df is not None:
+            return df
+
+    if wizards is None:
+        wiz_id = web_save(uid, company_id, options)
+        xlsx_path = render_xlsx(uid, csrf, company_id, options, wiz_id, direct)
+    else:
+        wiz_id = wizards.checkout(uid, company_id, options)
+        try:
+            xlsx_path = render_xlsx(uid, csrf, company_id, options, wiz_id, direct)
+        finally:
+            wizards.release(company_id, wiz_id, options)
+    df = read_second_tab(xlsx_path, row_limit)
+    if cache is not None:
+        cache.put(key, company_id, date_from, date_to, xlsx_path, df, row_limit)
+    return df
+
+
+def fetch_report(job, uid, csrf, date_from, date_to, row_limit=None, wizards=None,
+                 direct=ot_report.DIRECT_DOWNLOAD, cache=None, source=DEFAULT_SOURCE):
+    """
+    The report of one job for one date range. The "raw" source builds it from
+    attendance records and bypasses the wizard and the cache.
+    """
+    company_id = job["company_id"]
+    if source == "raw":
+        return ot_raw.fetch_raw_report(uid, company_id, job["category_id"], date_from, date_to, row_limit)
+    options = report_options(job["category_id"], date_from, date_to)
+    return render_report(uid, csrf, company_id, options, date_to, row_limit, wizards, direct, cache)
+
+
+def generate_report(job, uid, csrf, onchange_done, incremental=False, wizards=None,
+                    direct=ot_report.DIRECT_DOWNLOAD, cache=None, source=DEFAULT_SOURCE):
+    """
+    Odoo side of one job; in incremental mode only days missing from history are
+    fetched. The UI-parity onchange() is skipped when wizards are reused,
+    reports are cached or no wizard is involved, so a cache hit costs no Odoo
+    call at all.
+    """
+    label = f" ({job['label']})" if job.get("label") else ""
+    print(f"▶️ {job['name']}{label}: company {job['company_id']}, category {job['category_id']}")
+    company_id = job["company_id"]
+    if wizards is None and cache is None and source == "xlsx" and company_id not in onchange_done:
+        onchange_done.add(company_id)
+        onchange(uid, company_id)   # not strictly required, but keeps parity with UI
+
+    if not incremental:
+        return fetch_report(job, uid, csrf, ot_report.DATE_FROM, ot_report.DATE_TO, job["row_limit"],
+                            wizards, direct, cache, source)
+    key = f"{ot_report.REPORT_TYPE}_co{company_id}_cat{job['category_id']}"
+    return ot_history.update_report(
+        key, ot_report.DATE_FROM, ot_report.DATE_TO,
+        lambda date_from, date_to: fetch_report(job, uid, csrf, date_from, date_to,
+                                                 wizards=wizards, direct=direct, cache=cache, source=source))
+
+
+def group_by_spreadsheet(jobs):
+    """{spreadsheet id: [jobs]}, in job order, so every spreadsheet is opened once."""
+    groups = {}
+    for job in jobs:
+        groups.setdefault(extract_id_from_url(job["sheet_url"]), []).append(job)
+    return groups
+
+
+def write_reports(group, results, gc, sync=ot_report.SHEETS_SYNC, totals=ot_report.SHEETS_TOTALS,
+                  skip_unchanged=ot_report.SHEETS_SKIP_UNCHANGED):
+    """All tabs of one spreadsheet in one batchUpdate + one values batchUpdate; returns the unchanged jobs."""
+    tabs = [(job["sheet_name"], results[job["name"]][0], job["row_limit"], job["formula_rows"],
+             job.get("row4_format")) for job in group]
+    skipped = write_spreadsheet(gc, group[0]["sheet_url"], tabs, sync, totals, skip_unchanged)
+    return [job["name"] for job in group if job["sheet_name"] in skipped]
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def report_key(job):
+    """Jobs with the same key ask Odoo for the identical report."""
+    options = report_options(job["category_id"], ot_report.DATE_FROM, ot_report.DATE_TO)
+    return ot_report.options_key(job["company_id"], options)
+
+
+def coalesce(jobs):
+    """{report key: [jobs]}, in job order; each group needs only one render."""
+    groups = {}
+    for job in jobs:
+        groups.setdefault(report_key(job), []).append(job)
+    return groups
+
+
+def generate_all(jobs, uid, csrf, workers, incremental=False, reuse_wizard=False,
+                 direct=ot_report.DIRECT_DOWNLOAD, cache=None, source=DEFAULT_SOURCE):
+    """
+    Run the Odoo pipeline once per unique report, up to `workers` at a time,
+    and fan each parsed frame out to every job that consumes it. Returns
+    {name: (df, seconds)} for jobs that succeeded and {name: error} for the
+    rest; jobs that reused another job's report show 0 seconds.
+    """
+    onchange_done = set()
+    wizards = WizardPool() if reuse_wizard else None
+    results, errors = {}, {}
+    groups = list(coalesce(jobs).values())
+    for group in groups:
+        if len(group) > 1:
+            print(f"♻️ {', '.join(job['name'] for job in group[1:])}: same report as {group[0]['name']}, rendered once")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for group in groups:
+            leader = {**group[0], "row_limit": max(job["row_limit"] for job in group)}
+            future = pool.submit(timed, generate_report, leader, uid, csrf, onchange_done,
+                                 incremental, wizards, direct, cache, source)
+            futures[future] = group
+        for future in as_completed(futures):
+            group = futures[future]
+            name = group[0]["name"]
+            try:
+                df, seconds = future.result()
+                print(f"⏱️ {name} generated in {seconds:.1f}s")
+                for i, job in enumerate(group):
+                    results[job["name"]] = (df, seconds if i == 0 else 0.0)
+            except Exception as e:
+                print(f"❌ {name} failed: {e}")
+                errors.update((job["name"], e) for job in group)
+    return results, errors
+
+
+def print_timings(jobs, results, write_times, wall, unchanged=()):
+    print("\n===== Job timings =====")
+    print(f"{'job':<14}{'odoo':>10}{'sheets':>10}")
+    for job in jobs:
+        name = job["name"]
+        odoo = f"{results[name][1]:.1f}s" if name in results else "failed"
+        sheets = f"{write_times[name]:.1f}s" if name in write_times else "-"
+        sheets = "unchanged" if name in unchanged else sheets
+        print(f"{name:<14}{odoo:>10}{sheets:>10}")
+    serial = sum(seconds for _, seconds in results.values()) + sum(write_times.values())
+    print(f"Wall time {wall:.1f}s vs {serial:.1f}s of job time run back to back "
+          f"({serial / wall if wall else 0:.1f}x)")
+
+
+def print_stats():
+    print("\n===== Stages =====")
+    print(f"{'stage':<22}{'calls':>6}{'total':>9}{'max':>8}{'KiB':>9}{'retries':>8}")
+    for name, stats in ot_trace.stage_summary().items():
+        print(f"{name:<22}{stats['calls']:>6}{stats['seconds']:>8.1f}s{stats['max_seconds']:>7.1f}s"
+              f"{stats['bytes'] / 1024:>9.0f}{stats['retries']:>8}")
+    http = ot_report.http_stats()
+    requests_sent = sum(stats["requests"] for stats in http["endpoints"].values())
+    print(f"🌐 HTTP: {requests_sent} request(s), Odoo over {http['connections']} connection(s)")
+    for endpoint, stats in sorted(http["endpoints"].items()):
+        print(f"   {endpoint}: {stats['requests']} × avg {stats['seconds'] / stats['requests']:.2f}s, "
+              f"max {stats['max_seconds']:.2f}s")
+    rpcs = ot_report.odoo_rpc_stats()
+    print(f"📊 Odoo RPCs: {sum(rpcs.values())} ({', '.join(f'{k} {v}' for k, v in sorted(rpcs.items()))})")
+    for name, stats in ot_report.sheets_quota_stats().items():
+        print(f"📊 Sheets {name}s: {stats['calls']} call(s), {stats['throttled_seconds']}s paced, "
+              f"{stats['rate_limited']} 429(s)")
+
+
+def run_summary(jobs, results, errors, write_times, settings, started_at, wall, unchanged=()):
+    """Everything the run measured, as one JSON-able dict (stages are added by ot_trace)."""
+    return {
+        "started_at": started_at,
+        "wall_seconds": round(wall, 3),
+        "error": str(errors["run"]) if "run" in errors else None,
+        "date_from": ot_report.DATE_FROM,
+        "date_to": ot_report.DATE_TO,
+        "settings": settings,
+        "jobs": {
+            job["name"]: {
+                "company_id": job["company_id"],
+                "category_id": job["category_id"],
+                "status": "failed" if job["name"] in errors else "ok",
+                "error": str(errors[job["name"]]) if job["name"] in errors else None,
+                "odoo_seconds": round(results[job["name"]][1], 3) if job["name"] in results else None,
+                "sheets_seconds": round(write_times[job["name"]], 3) if job["name"] in write_times else None,
+                "sheets_skipped_unchanged": job["name"] in unchanged,
+            }
+            for job in jobs
+        },
+        "sheets_skipped": sorted(unchanged),
+        "odoo_rpcs": ot_report.odoo_rpc_stats(),
+        "http": ot_report.http_stats(),
+        "sheets_quota": ot_report.sheets_quota_stats(),
+    }
+
+
+def main(names=None, workers=DEFAULT_WORKERS, incremental=DEFAULT_INCREMENTAL,
+         sync=ot_report.SHEETS_SYNC, totals=ot_report.SHEETS_TOTALS, jobs_file=DEFAULT_JOBS_FILE,
+         reuse_wizard=ot_report.REUSE_WIZARD, direct=ot_report.DIRECT_DOWNLOAD,
+         cache_ttl=ot_cache.CACHE_TTL_HOURS, cache_probe=ot_cache.CACHE_PROBE,
+         skip_unchanged=ot_report.SHEETS_SKIP_UNCHANGED, source=DEFAULT_SOURCE):
+    """
+    Run every job in `jobs_file` (or only those in `names`) with one Odoo session and one
+    gspread client. Odoo reports are generated `workers` at a time; Sheets
+    writes then go out one spreadsheet at a time, all of its tabs together.
+    """
+    all_jobs = load_jobs(jobs_file)
+    jobs = [job for job in all_jobs if not names or job["name"] in names]
+    if not jobs:
+        raise SystemExit(f"❌ No jobs match {names}; known: {[job['name'] for job in all_jobs]}")
+
+    print(f"📋 {len(jobs)} job(s), {ot_report.DATE_FROM} → {ot_report.DATE_TO}, {workers} worker(s), "
+          f"{source} source")
+    if source == "raw":
+        print("⚠️ Raw source is unverified: OT_RAW_* field names are guesses, compare with an xlsx run")
+    settings = {"workers": workers, "incremental": incremental, "sync": sync, "totals": totals,
+                "reuse_wizard": reuse_wizard, "direct_download": direct,
+                "cache_ttl_hours": cache_ttl, "cache_probe": cache_probe, "skip_unchanged": skip_unchanged,
+                "source": source}
+    started_at = datetime.now().isoformat(timespec="seconds")
+    started = time.perf_counter()
+    results, errors, write_times = {}, {}, {}
+    unchanged = set()
+    renders_saved = len(jobs) - len(coalesce(jobs))
+    cache = None
+    try:
+        pool_size = max(ot_report.ODOO_POOL_SIZE, workers + 1)
+        ot_report.mount_transport(pool_size)
+        uid, csrf = ensure_session()
+        gc = authorize_gspread()
+
+        if cache_ttl > 0 and source == "xlsx":
+            probe = ((lambda company_id, date_to: latest_attendance_write(uid, company_id, date_to))
+                     if cache_probe else None)
+            cache = ReportCache(ttl_hours=cache_ttl, probe=probe)
+        results, errors = generate_all(jobs, uid, csrf, max(1, workers), incremental, reuse_wizard, direct,
+                                       cache, source)
+        if renders_saved:
+            print(f"♻️ {renders_saved} duplicate Odoo render(s) saved by coalescing")
+
+        for sheet_id, group in group_by_spreadsheet([job for job in jobs if job["name"] in results]).items():
+            names = [job["name"] for job in group]
+            try:
+                skipped, seconds = timed(write_reports, group, results, gc, sync, totals, skip_unchanged)
+            except Exception as e:
+                print(f"❌ Spreadsheet {sheet_id} ({', '.join(names)}) failed: {e}")
+                errors.update((name, e) for name in names)
+                continue
+            unchanged.update(skipped)
+            written = [name for name in names if name not in skipped]
+            for name in written:   # one shared write, split evenly for the timing table
+                write_times[name] = seconds / len(written)
+    except BaseException as e:
+        errors.setdefault("run", e)
+        raise
+    finally:
+        wall = time.perf_counter() - started
+        print_timings(jobs, results, write_times, wall, unchanged)
+        print_stats()
+        if unchanged:
+            print(f"⏭️ {len(unchanged)} tab(s) unchanged, Sheets write skipped: {', '.join(sorted(unchanged))}")
+        summary = run_summary(jobs, results, errors, write_times, settings, started_at, wall, unchanged)
+        summary["renders_saved"] = renders_saved
+        summary["report_cache"] = cache.stats() if cache else None
+        if cache:
+            print(f"🗄️ Report cache: {cache.hits} hit(s), {cache.misses} miss(es)")
+        try:
+            print(f"🧾 Trace written to {ot_trace.write_summary(summary)}")
+        except OSError as e:
+            print(f"⚠️ Could not write run trace: {e}")
+
+    if errors:
+        raise SystemExit(f"❌ {len(errors)}/{len(jobs)} job(s) failed: {', '.join(errors)}")
+    print("🎉 Done.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate OT reports and paste them to Google Sheets.")
+    parser.add_argument("jobs", nargs="*", help="job names to run (default: all)")
+    parser.add_argument("--jobs-file", default=DEFAULT_JOBS_FILE,
+                        help="JSON job spec (default: $REPORT_JOBS or jobs.json)")
+    parser.add_argument("--check", action="store_true",
+                        help="validate the job spec, list the jobs and exit")
+    parser.add_argument("-w", "--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Odoo reports generated concurrently (default: $REPORT_WORKERS or 1)")
+    parser.add_argument("--incremental", action="store_true", default=DEFAULT_INCREMENTAL,
+                        help="fetch only days missing from local history (default: $OT_INCREMENTAL=1)")
+    parser.add_argument("--reuse-wizard", action="store_true", default=ot_report.REUSE_WIZARD,
+                        help="one Odoo wizard per company, updated per category with write() "
+                             "(default: $ODOO_REUSE_WIZARD=1)")
+    parser.add_argument("--direct-download", action="store_true", default=ot_report.DIRECT_DOWNLOAD,
+                        help="skip the report button when the report name is cached "
+                             "(default: $ODOO_DIRECT_DOWNLOAD=1)")
+    parser.add_argument("--source", choices=["xlsx", "raw"], default=DEFAULT_SOURCE,
+                        help="xlsx = Odoo renders the report, raw = build it from attendance records; "
+                             "raw is UNVERIFIED: its OT_RAW_* field names are unconfirmed guesses, so "
+                             "check its output against an xlsx run first (default: $OT_SOURCE or xlsx)")
+    parser.add_argument("--cache-ttl", type=float, default=ot_cache.CACHE_TTL_HOURS, metavar="HOURS",
+                        help="reuse rendered reports with the same options for this long, 0 = off "
+                             "(default: $OT_CACHE_TTL_HOURS or 0)")
+    parser.add_argument("--cache-probe", action="store_true", default=ot_cache.CACHE_PROBE,
+                        help="also require Odoo's latest attendance change to match the cached one "
+                             "(default: $OT_CACHE_PROBE=1)")
+    parser.add_argument("--sync", choices=["full", "diff"], default=ot_report.SHEETS_SYNC,
+                        help="full = clear + rewrite, diff = send changed cells only (default: $SHEETS_SYNC or full)")
+    parser.add_argument("--skip-unchanged", action="store_true", default=ot_report.SHEETS_SKIP_UNCHANGED,
+                        help="leave tabs alone when their content hash matches the last write "
+                             "(default: $SHEETS_SKIP_UNCHANGED=1)")
+    parser.add_argument("--totals", choices=["formula", "values"], default=ot_report.SHEETS_TOTALS,
+                        help="odd/even-row totals as SUMPRODUCT formulas or static values "
+                             "(default: $SHEETS_TOTALS or formula)")
+    args = parser.parse_args()
+    if args.check:
+        for job in load_jobs(args.jobs_file):
+            print(f"✅ {job['name']:<10} company {job['company_id']}, category {job['category_id']} → "
+                  f"{job['spreadsheet']}/{job['sheet_name']} ({job['row_limit']} rows, totals {job['formula_rows']})")
+        raise SystemExit(0)
+    main(args.jobs, args.workers, args.incremental, args.sync, args.totals, args.jobs_file,
+         args.reuse_wizard, args.direct_download, args.cache_ttl, args.cache_probe, args.skip_unchanged,
+         args.source)
@@ -0,0 +1,57 @@
+"""
+Check that totals="values" writes exactly what the SUMPRODUCT formulas in
+rows 51/52 (47-row tabs) and 84/85 (80-row tabs) evaluate to, using the
+committed ot_analysis_*.xlsx samples, and compare the payload sizes.
+
+    python verify_ot_totals.py
+"""
+import re
+import json
+import glob
+import math
+
+from ot_report import read_second_tab, sheet_values, col_index
+
+SUMPRODUCT = re.compile(r"^=SUMPRODUCT\(\(MOD\(ROW\(([A-Z]+)(\d+):[A-Z]+(\d+)\),2\)=([01])\)\*")
+
+
+def evaluate(formula, grid):
+    """Evaluate one generated SUMPRODUCT formula the way Sheets would."""
+    col, first, last, parity = SUMPRODUCT.match(formula).groups()
+    c = col_index(col)
+    total = 0.0
+    for row in range(int(first), int(last) + 1):
+        if row % 2 != int(parity):
+            continue
+        cells = grid[row - 1] if row - 1 < len(grid) else []
+        value = cells[c] if c < len(cells) else ""
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            total += value
+    return total
+
+
+def main():
+    files = sorted(glob.glob("ot_analysis_*.xlsx"))
+    if not files:
+        raise SystemExit("❌ No ot_analysis_*.xlsx samples in the current directory")
+
+    for path in files:
+        df = read_second_tab(path)
+        for row_limit, formula_rows in ((47, [51, 52]), (80, [84, 85])):
+            formulas = sheet_values(df, row_limit, formula_rows, totals="formula")
+            values = sheet_values(df, row_limit, formula_rows, totals="values")
+            if formulas[:-2] != values[:-2]:
+                raise SystemExit(f"❌ {path}: grids differ outside the totals rows")
+            for f_row, v_row in zip(formulas[-2:], values[-2:]):
+                for formula, value in zip(f_row[3:], v_row[3:]):
+                    expected = evaluate(formula, formulas)
+                    if not math.isclose(expected, value, rel_tol=1e-9, abs_tol=1e-9):
+                        raise SystemExit(f"❌ {path} rows {formula_rows}: {formula} = {expected}, got {value}")
+            f_bytes = len(json.dumps(formulas[-2:]))
+            v_bytes = len(json.dumps(values[-2:]))
+            print(f"✅ {path} rows {formula_rows[0]}/{formula_rows[1]}: totals match, "
+                  f"{f_bytes} → {v_bytes} bytes")
+
+
+if __name__ == "__main__":
+    main()